@@ -0,0 +1,151 @@
+import argparse
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from cache import ExpressionCache
+from evaluator import ERROR_POLICIES, evaluate_in_range
+
+OUTPUT_FORMATS = ('.npz', '.npy', '.csv')
+
+_expression_cache = ExpressionCache()
+
+
+class BatchJob:
+    def __init__(self, line_number, expression, min_x, max_x):
+        """ A single expression to sample, as read from one line of a batch file. """
+        self.line_number = line_number
+        self.expression = expression
+        self.min_x = min_x
+        self.max_x = max_x
+
+
+def parse_jobs(lines):
+    """ Reads batch jobs from lines of the form `MIN MAX EXPRESSION`.
+
+    Blank lines and lines starting with '#' are skipped.
+
+    :param lines: An iterable of strings, e.g. an open file.
+    :return: The list of jobs and the list of errors for lines that could not be read.
+    """
+    jobs = []
+    errors = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line == '' or line.startswith('#'):
+            continue
+
+        fields = line.split(None, 2)
+        try:
+            if len(fields) < 3:
+                raise ValueError()
+            jobs.append(BatchJob(line_number, fields[2], float(fields[0]), float(fields[1])))
+        except ValueError:
+            errors.append(f'Line {line_number}: Batch Error: Expected a line of the form \'MIN MAX EXPRESSION\'.')
+
+    return jobs, errors
+
+
+def evaluate_job(job, n_points, errors='mask'):
+    """ Samples one job, see `evaluate_in_range`.
+
+    :return: The x-values and y-values, and None, or None, None and the error message if the job failed.
+    """
+    try:
+        compiled = _expression_cache.compile(job.expression)
+        x_values, y_values = evaluate_in_range(compiled, job.min_x, job.max_x, n_points=n_points, errors=errors)
+    except Exception as e:
+        return None, None, f'Line {job.line_number}: {e}'
+
+    return np.asarray(x_values, dtype=float), np.asarray(y_values, dtype=float), None
+
+
+def evaluate_jobs(jobs, n_points=50000, processes=None, errors='mask'):
+    """ Samples all jobs in parallel, one job per task.
+
+    :param processes: The number of worker processes, by default one per CPU. With 1, the jobs are
+     evaluated in the calling process.
+    :param errors: The floating-point error policy, see `evaluator.evaluate_with_policy`.
+    :return: A list of (x_values, y_values, error) tuples, in the order of `jobs`.
+    """
+    tasks = [(job, n_points, errors) for job in jobs]
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes <= 1 or len(jobs) <= 1:
+        return [evaluate_job(*task) for task in tasks]
+
+    with multiprocessing.Pool(min(processes, len(jobs))) as pool:
+        return pool.starmap(evaluate_job, tasks, chunksize=max(1, len(tasks) // (processes * 4)))
+
+
+def write_results(path, jobs, results):
+    """ Writes the sampled values to `path`, in a format chosen by its extension.
+
+    - `.npz`: one archive with the arrays `x_<i>` and `y_<i>` for the i-th job, and `expressions`.
+    - `.npy`: one file `<name>_<i>.npy` per job, holding the 2 x N array of its x-values and y-values.
+    - `.csv`: one file with the columns `index`, `x` and `y`.
+
+    Jobs that failed are left out, the indices refer to the position of the job in `jobs`.
+    """
+    succeeded = [(i, x_values, y_values) for i, (x_values, y_values, error) in enumerate(results) if error is None]
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.npz':
+        arrays = {'expressions': np.array([job.expression for job in jobs])}
+        for i, x_values, y_values in succeeded:
+            arrays[f'x_{i}'] = x_values
+            arrays[f'y_{i}'] = y_values
+        np.savez(path, **arrays)
+    elif extension == '.npy':
+        stem = os.path.splitext(path)[0]
+        for i, x_values, y_values in succeeded:
+            np.save(f'{stem}_{i}.npy', np.stack((x_values, y_values)))
+    elif extension == '.csv':
+        with open(path, 'w') as output:
+            output.write('index,x,y\n')
+            for i, x_values, y_values in succeeded:
+                np.savetxt(output, np.column_stack((np.full(len(x_values), i), x_values, y_values)),
+                           fmt=['%d', '%.17g', '%.17g'], delimiter=',')
+    else:
+        raise ValueError(f'Batch Error: Unsupported output format \'{extension}\'.')
+
+
+def main(argv=None):
+    """ Samples every expression of a batch file and writes the results, without loading PyQt5 or matplotlib.
+
+    :return: The exit status, 0 if every expression was sampled.
+    """
+    argument_parser = argparse.ArgumentParser(
+        prog='batch',
+        description='Sample many expressions in parallel. Each input line is of the form MIN MAX EXPRESSION.')
+    argument_parser.add_argument('input', nargs='?', default='-', help='batch file, or - for stdin (default)')
+    argument_parser.add_argument('-o', '--output', required=True, help='output file, .npz, .npy or .csv')
+    argument_parser.add_argument('-n', '--n-points', type=int, default=50000, help='samples per expression')
+    argument_parser.add_argument('-j', '--processes', type=int, default=None, help='worker processes')
+    argument_parser.add_argument('--errors', choices=ERROR_POLICIES, default='mask',
+                                 help='on division by zero or overflow: raise (fail the job), mask (nan, default) '
+                                      'or clip (largest finite float)')
+    arguments = argument_parser.parse_args(argv)
+    if os.path.splitext(arguments.output)[1].lower() not in OUTPUT_FORMATS:
+        argument_parser.error('the output file must end with .npz, .npy or .csv')
+
+    if arguments.input == '-':
+        jobs, errors = parse_jobs(sys.stdin)
+    else:
+        with open(arguments.input) as input_file:
+            jobs, errors = parse_jobs(input_file)
+
+    results = evaluate_jobs(jobs, arguments.n_points, arguments.processes, arguments.errors)
+    errors += [error for _, _, error in results if error is not None]
+    write_results(arguments.output, jobs, results)
+
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if len(errors) > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import gc
+import timeit
+import tracemalloc
+
+from benchmarks.bench_suite import balanced_expression, count_nodes, nested_expression
+from expr_parser.lexer import Lexer
+from expr_parser.parser import Parser
+
+EXPRESSIONS = [
+    ('balanced_65536', balanced_expression(1 << 16)),
+    ('nested_20000', nested_expression(20000)),
+]
+
+
+def measure_memory(function):
+    """ Measures the memory still allocated by the objects that `function` returns.
+
+    :return: The returned object and its size in bytes.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def bench_ast(text, repeat=3):
+    """ Measures the memory held by the tokens and the tree of `text`, and the time to parse it.
+
+    :return: The number of tokens, the bytes per token, the number of nodes, the bytes per node of the tree
+     (including its tokens) and the best parse time in seconds.
+    """
+    tokens, tokens_size = measure_memory(lambda: Lexer(text).tokenize())
+    ast, ast_size = measure_memory(lambda: Parser(text).parse())
+    n_nodes = count_nodes(ast)
+    del tokens, ast
+
+    seconds = min(timeit.repeat(lambda: Parser(text).parse(), repeat=repeat, number=1))
+    n_tokens = len(Lexer(text).tokenize())
+    return n_tokens, tokens_size / n_tokens, n_nodes, ast_size / n_nodes, seconds
+
+
+def main():
+    print(f'{"expression":<18}{"tokens":>10}{"per token":>12}{"nodes":>10}{"per node":>12}{"parse":>12}')
+    for name, text in EXPRESSIONS:
+        n_tokens, token_bytes, n_nodes, node_bytes, seconds = bench_ast(text)
+        print(f'{name:<18}{n_tokens:>10}{token_bytes:>10.1f} B{n_nodes:>10}{node_bytes:>10.1f} B'
+              f'{seconds * 1e3:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
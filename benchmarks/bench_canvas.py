@@ -0,0 +1,58 @@
+import os
+import sys
+
+import numpy as np
+
+CURVE_COUNTS = [1, 4, 16]
+
+
+def bench_canvas(canvas, app, n_curves, repeat=20):
+    """ Measures the frame times of re-plotting `n_curves` curves with and without a change of the limits.
+
+    :return: The median frame times in seconds of a full redraw and of a blitted update.
+    """
+    frame_times = {'draw': [], 'blit': []}
+    canvas.frame_drawn.connect(lambda kind, seconds: frame_times[kind].append(seconds))
+
+    x_values = np.linspace(-10, 10, 20000)
+    curves = np.stack([np.sin(x_values * (i + 1)) for i in range(n_curves)])
+    canvas.labels = [f'curve {i}' for i in range(n_curves)]
+
+    for i in range(repeat):
+        # Doubling the amplitude moves the bounds of the data, so the axes are rescaled and fully redrawn.
+        canvas.x_values, canvas.y_values = x_values, curves * 2 ** (i % 2)
+        canvas.show_plot()
+        app.processEvents()
+
+    full_draws = frame_times['draw'][:]
+    frame_times['draw'].clear()
+    for i in range(repeat + 1):
+        canvas.y_values = curves * (1 + 0.001 * (i % 2))
+        canvas.show_plot()
+        app.processEvents()
+
+    canvas.frame_drawn.disconnect()
+    # The first blitted update also captures the background with a full draw.
+    return np.median(full_draws), np.median(frame_times['blit'][1:])
+
+
+def main():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QWidget
+
+    from gui import Canvas
+
+    app = QApplication(sys.argv)
+    parent = QWidget()
+    parent.resize(1000, 750)
+
+    print(f'{"curves":<10}{"full draw":>14}{"blit":>14}{"speedup":>10}')
+    for n_curves in CURVE_COUNTS:
+        canvas = Canvas(parent, [], [])
+        draw_time, blit_time = bench_canvas(canvas, app, n_curves)
+        print(f'{n_curves:<10}{draw_time * 1e3:>11.2f} ms{blit_time * 1e3:>11.2f} ms{draw_time / blit_time:>9.1f}x')
+        canvas.deleteLater()
+
+
+if __name__ == '__main__':
+    main()
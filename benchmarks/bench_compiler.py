@@ -0,0 +1,45 @@
+import timeit
+
+from compiler import compile_ast
+from evaluator import Evaluator
+from expr_parser.parser import Parser
+
+EXPRESSIONS = [
+    'x',
+    '2*x^4 + 4 * x - 12',
+    '5 * x ^ (2 * (3 + 4)) - (x + 1) / (x - 1)',
+    '-2 * x ^ -3 + ((((x + 1) * 2 - 3) / 4 + 5) * 6 - 7) / 8',
+]
+
+
+def bench_evaluator(ast, number):
+    evaluator = Evaluator(ast)
+
+    def run():
+        evaluator.set_var('x', 1.5)
+        evaluator.eval()
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number
+
+
+def bench_compiled(ast, number):
+    compiled = compile_ast(ast)
+
+    def run():
+        compiled.eval(x=1.5)
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number
+
+
+def main(number=20000):
+    print(f'{"expression":<60}{"Evaluator":>14}{"Compiled":>14}{"speedup":>10}')
+    for expr in EXPRESSIONS:
+        ast = Parser(expr).parse()
+        evaluator_time = bench_evaluator(ast, number)
+        compiled_time = bench_compiled(ast, number)
+        print(f'{expr:<60}{evaluator_time * 1e6:>11.2f} us{compiled_time * 1e6:>11.2f} us'
+              f'{evaluator_time / compiled_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
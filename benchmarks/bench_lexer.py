@@ -0,0 +1,33 @@
+import timeit
+
+from benchmarks.bench_suite import balanced_expression
+from expr_parser.lexer import Lexer
+
+# Inputs of about 1 MB each: many one- and two-character tokens, fewer long identifiers and numbers, and tokens
+# separated by runs of whitespace.
+INPUTS = [
+    ('short tokens', balanced_expression(1 << 17)),
+    ('long tokens', ' + '.join([f'variable_{"x" * 40} * 123456789.123456789'] * 15000)),
+    ('whitespace', ' +\n'.join(f'    {i % 1000}\t*\tx' for i in range(80000))),
+]
+
+
+def bench_lexer(text, repeat=3):
+    """ Measures the throughput of tokenizing `text`.
+
+    :return: The best throughput in MB of text per second, and the number of tokens produced.
+    """
+    n_tokens = len(Lexer(text).tokenize())
+    seconds = min(timeit.repeat(lambda: Lexer(text).tokenize(), repeat=repeat, number=1))
+    return len(text) / seconds / 1e6, n_tokens
+
+
+def main():
+    print(f'{"input":<16}{"size":>10}{"tokens":>10}{"throughput":>14}')
+    for name, text in INPUTS:
+        throughput, n_tokens = bench_lexer(text)
+        print(f'{name:<16}{len(text) / 1e6:>7.2f} MB{n_tokens:>10}{throughput:>9.1f} MB/s')
+
+
+if __name__ == '__main__':
+    main()
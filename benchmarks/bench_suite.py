@@ -0,0 +1,223 @@
+import argparse
+import datetime
+import json
+import platform
+import sys
+import timeit
+
+import numpy as np
+
+from codegen import generate
+from compiler import compile_ast
+from evaluator import Evaluator, evaluate_in_range
+from expr_parser.lexer import Lexer
+from expr_parser.parser import Parser
+from expr_parser.tokens import Token
+
+BENCHMARKS = ['lexer', 'parser', 'evaluator', 'compiled', 'codegen', 'range']
+
+BALANCED_LEAVES = [16, 256, 4096]
+
+NESTED_DEPTHS = [16, 64, 128]
+
+N_POINTS_SCALES = [1000, 100000, 1000000]
+
+# Range evaluation of the largest expressions at the largest scales takes seconds per call.
+MAX_RANGE_WORK = 1 << 29
+
+OPERATORS = ['+', '*', '-', '/']
+
+
+def balanced_expression(n_leaves):
+    """ Builds an expression whose tree is balanced, with `n_leaves` leaves alternating between x and numbers. """
+    def build(start, count, level):
+        if count == 1:
+            return 'x' if start % 2 == 0 else str(start % 7 + 1)
+        half = count // 2
+        operator = OPERATORS[level % len(OPERATORS)]
+        return f'({build(start, half, level + 1)} {operator} {build(start + half, count - half, level + 1)})'
+
+    return build(0, n_leaves, 0)
+
+
+def nested_expression(depth):
+    """ Builds an expression that nests `depth` parenthesized binary operations inside each other. """
+    text = 'x'
+    for i in range(depth):
+        text = f'({i % 9 + 1} {OPERATORS[i % len(OPERATORS)]} {text})'
+    return text
+
+
+def build_corpus():
+    """ The expressions to benchmark, from a single identifier up to thousands of nodes.
+
+    :return: A list of (name, expression) pairs, in increasing order of size within each family.
+    """
+    corpus = [
+        ('identifier', 'x'),
+        ('polynomial', '2*x^4 + 4 * x - 12'),
+        ('rational', '5 * x ^ (2 * (3 + 4)) - (x + 1) / (x - 1)'),
+    ]
+    corpus += [(f'balanced_{n_leaves}', balanced_expression(n_leaves)) for n_leaves in BALANCED_LEAVES]
+    corpus += [(f'nested_{depth}', nested_expression(depth)) for depth in NESTED_DEPTHS]
+    return corpus
+
+
+def count_nodes(ast):
+    """ Counts the expression nodes of an AST object, tokens excluded. """
+    count = 0
+    stack = [ast.main_expression]
+    while len(stack) > 0:
+        node = stack.pop()
+        count += 1
+        stack.extend(child for child in node.get_children() if not isinstance(child, Token))
+    return count
+
+
+def measure(function, repeat):
+    """ Times `function`, calling it enough times per run for the run to take at least 0.2 seconds.
+
+    :return: The best time of a single call, in seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def get_cases(corpus):
+    """ Generates the benchmark cases for the corpus.
+
+    :return: A generator of (key, benchmark, name, ast, n_points, function) tuples.
+    """
+    for name, text in corpus:
+        ast = Parser(text).parse()
+
+        yield f'lexer/{name}', 'lexer', name, ast, None, lambda text=text: Lexer(text).tokenize()
+        yield f'parser/{name}', 'parser', name, ast, None, lambda text=text: Parser(text).parse()
+
+        evaluator = Evaluator(ast)
+        evaluator.set_var('x', 1.5)
+        yield f'evaluator/{name}', 'evaluator', name, ast, None, evaluator.eval
+
+        compiled = compile_ast(ast)
+        yield f'compiled/{name}', 'compiled', name, ast, None, lambda compiled=compiled: compiled.eval(x=1.5)
+
+        generated = generate(ast)
+        yield f'codegen/{name}', 'codegen', name, ast, None, lambda generated=generated: generated.eval(x=1.5)
+
+        for n_points in N_POINTS_SCALES:
+            if count_nodes(ast) * n_points <= MAX_RANGE_WORK:
+                yield (f'range/{name}/{n_points}', 'range', name, ast, n_points,
+                       lambda compiled=compiled, n_points=n_points: evaluate_in_range(compiled, -10, 10,
+                                                                                       n_points=n_points))
+
+
+def run(pattern='', repeat=3, output=sys.stdout):
+    """ Runs every benchmark whose key contains `pattern`, printing the results as they are measured.
+
+    :param pattern: Selects benchmarks by a substring of their key, e.g. 'parser/' or 'balanced'.
+    :param repeat: The number of timed runs per benchmark, the best one is kept.
+    :return: The results, in the form written by `save_results`.
+    """
+    results = {}
+    for key, benchmark, name, ast, n_points, function in get_cases(build_corpus()):
+        if pattern not in key:
+            continue
+
+        seconds = measure(function, repeat)
+        results[key] = {
+            'benchmark': benchmark,
+            'expression': name,
+            'nodes': count_nodes(ast),
+            'n_points': n_points,
+            'seconds': seconds,
+        }
+        print(f'{key:<40}{seconds * 1e6:>16.2f} us', file=output)
+
+    return {'metadata': get_metadata(), 'results': results}
+
+
+def get_metadata():
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def save_results(path, results):
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2)
+
+
+def load_results(path):
+    with open(path) as input_file:
+        return json.load(input_file)
+
+
+def compare(baseline, current, threshold=0.1):
+    """ Compares the timings of two runs, benchmark by benchmark.
+
+    :param baseline: The results of the reference run.
+    :param current: The results of the run to check.
+    :param threshold: The relative slowdown above which a benchmark counts as a regression, e.g. 0.1 for 10%.
+    :return: A list of (key, baseline seconds, current seconds, ratio, regressed) tuples, for the benchmarks
+     present in both runs.
+    """
+    comparison = []
+    for key, result in current['results'].items():
+        if key not in baseline['results']:
+            continue
+        old_seconds = baseline['results'][key]['seconds']
+        new_seconds = result['seconds']
+        ratio = new_seconds / old_seconds
+        comparison.append((key, old_seconds, new_seconds, ratio, ratio > 1 + threshold))
+    return comparison
+
+
+def print_comparison(comparison, output=sys.stdout):
+    print(f'{"benchmark":<40}{"baseline":>16}{"current":>16}{"change":>10}', file=output)
+    for key, old_seconds, new_seconds, ratio, regressed in comparison:
+        print(f'{key:<40}{old_seconds * 1e6:>13.2f} us{new_seconds * 1e6:>13.2f} us{(ratio - 1) * 100:>+9.1f}%'
+              f'{"  REGRESSION" if regressed else ""}', file=output)
+
+
+def main(argv=None):
+    """ Runs the benchmark suite, or compares two sets of results.
+
+    :return: The exit status, 1 if a comparison found a regression.
+    """
+    argument_parser = argparse.ArgumentParser(
+        prog='bench',
+        description='Benchmark the lexer, parser, evaluators and range evaluation over a corpus of expressions.')
+    argument_parser.add_argument('-o', '--output', help='save the results to this JSON file')
+    argument_parser.add_argument('-k', '--filter', default='', help='only run benchmarks whose key contains this')
+    argument_parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs per benchmark')
+    argument_parser.add_argument('--compare', nargs='+', metavar='RESULTS',
+                                 help='compare a run with the baseline results in the first file, the second file '
+                                      'is used as the run if it is given, otherwise the suite is run')
+    argument_parser.add_argument('--threshold', type=float, default=0.1,
+                                 help='relative slowdown reported as a regression (default 0.1)')
+    arguments = argument_parser.parse_args(argv)
+    if arguments.compare is not None and len(arguments.compare) > 2:
+        argument_parser.error('--compare takes one or two result files')
+
+    if arguments.compare is not None and len(arguments.compare) == 2:
+        results = load_results(arguments.compare[1])
+    else:
+        results = run(arguments.filter, arguments.repeat)
+
+    if arguments.output is not None:
+        save_results(arguments.output, results)
+
+    if arguments.compare is None:
+        return 0
+
+    comparison = compare(load_results(arguments.compare[0]), results, arguments.threshold)
+    print_comparison(comparison)
+    return 1 if any(regressed for *_, regressed in comparison) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
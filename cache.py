@@ -0,0 +1,308 @@
+import collections
+import math
+import re
+import threading
+
+from compiler import compile_ast
+from expr_parser.functions import get_version
+from expr_parser.parser import Parser
+from lazy import LazyModule
+
+np = LazyModule('numpy')
+
+WHITESPACE_PATTERN = re.compile('[ \t\n\r]+')
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class ExpressionCache:
+    def __init__(self, maxsize=128, optimize=True, cse=True):
+        """ A bounded least-recently-used cache of lexed, parsed and compiled expressions.
+
+        Expressions are keyed by their source text with runs of whitespace collapsed, so re-plotting the
+        same formula reuses its AST and compiled form. Only expressions without errors are cached, so that
+        the error messages, which can contain column numbers, always refer to the text as it was typed.
+        Registering a function or a constant changes how the same text parses, so it empties the cache.
+
+        :param maxsize: The maximum number of expressions to keep.
+        :param optimize: Whether to simplify the trees before compiling them.
+        :param cse: Whether to evaluate common subexpressions only once.
+        """
+        self.maxsize = maxsize
+        self.optimize = optimize
+        self.cse = cse
+        self.hits = 0
+        self.misses = 0
+        self.__entries = collections.OrderedDict()
+        self.__version = get_version()
+
+    def parse(self, text):
+        """ Returns the AST of the expression `text`, see `Parser.parse`.
+
+        :rtype: AST
+        :return: The shared AST of the expression, or a fresh one containing the errors if it is not valid.
+        """
+        compiled = self.__lookup(text)
+        if compiled is None:
+            return Parser(text).parse()
+        return compiled.ast
+
+    def compile(self, text):
+        """ Returns the compiled form of the expression `text`.
+
+        :rtype: CompiledExpression
+        :return: The shared compiled expression.
+        :raises Exception: With the first lexer or parser error if the expression is not valid.
+        """
+        compiled = self.__lookup(text)
+        if compiled is None:
+            raise Exception(Parser(text).parse().errors[0])
+        return compiled
+
+    def info(self):
+        """ Reports the statistics of the cache, in the same form as `functools.lru_cache`.
+
+        :rtype: CacheInfo
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.__entries))
+
+    def clear(self):
+        """ Removes all expressions and resets the statistics. """
+        self.__entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __lookup(self, text):
+        if self.__version != get_version():
+            self.__entries.clear()
+            self.__version = get_version()
+
+        key = normalize_expression(text)
+        try:
+            compiled = self.__entries[key]
+        except KeyError:
+            pass
+        else:
+            self.__entries.move_to_end(key)
+            self.hits += 1
+            return compiled
+
+        self.misses += 1
+        ast = Parser(key).parse()
+        if len(ast.errors) > 0:
+            return None
+
+        compiled = compile_ast(ast, self.optimize, self.cse)
+        self.__entries[key] = compiled
+        if len(self.__entries) > self.maxsize:
+            self.__entries.popitem(last=False)
+        return compiled
+
+
+def normalize_expression(text):
+    """ Collapses every run of whitespace in `text` into a single space and strips it at both ends.
+
+    Whitespace can not be removed completely since it separates tokens, '1 1' is not the same as '11'.
+    Only the characters the lexer skips count as whitespace, anything else is left for the lexer to report.
+    """
+    return WHITESPACE_PATTERN.sub(' ', text).strip(' ')
+
+
+class SampleCache:
+    def __init__(self, max_points=4000000):
+        """ A bounded least-recently-used cache of sampled y-values, with reuse of overlapping ranges.
+
+        Samples are taken on a fixed grid x_i = i * delta, where delta is a power of two, so the grids of
+        two overlapping ranges of similar width line up and the values of their common part can be reused.
+        Each expression and grid keeps one contiguous run of samples that grows as neighbouring ranges
+        are requested. Only the part of a range that is not cached is evaluated.
+
+        The cache can be shared between threads. Evaluation happens outside of its lock, so a long
+        evaluation in a worker thread does not block lookups from other threads. The runs that two threads
+        evaluated for the same expression and grid at the same time are merged when they are stored.
+        Registering a function or a constant empties the cache, since the keys are usually source texts, whose
+        meaning depends on the registry.
+
+        :param max_points: The maximum total number of samples to keep, across all expressions. A group of
+         expressions counts one sample per expression and grid point.
+        """
+        self.max_points = max_points
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.evaluated_points = 0
+        self.cached_points = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+        self.__version = get_version()
+
+    def sample(self, key, function, min_x=0, max_x=1, n_points=50000):
+        """ Samples `function` over the range [min_x, max_x), reusing previously computed values.
+
+        :param key: Identifies the expression, e.g. its normalized source text, see `normalize_expression`.
+        :param function: Maps an array of x-values to the array of y-values of the expression. It can also
+         return several rows of y-values, one per expression of a group, along the last axis.
+        :param min_x: Lower bound of the sampling interval.
+        :param max_x: Upper bound of the sampling interval.
+        :param n_points: The maximum number of samples in the interval. The grid spacing is rounded up to a
+         power of two, so there are between n_points / 2 and n_points samples.
+        :return: The grid points within [min_x, max_x), and the corresponding read-only y-values, in the
+         shape returned by `function`.
+        """
+        if min_x > max_x:
+            min_x, max_x = max_x, min_x
+
+        if min_x == max_x:
+            return [], []
+
+        delta, start, stop = get_grid(min_x, max_x, n_points)
+        entry_key = (key, delta)
+
+        with self.__lock:
+            version = self.__check_version()
+            cached_start, cached_y = self.__entries.get(entry_key, (start, np.empty(0)))
+        cached_stop = cached_start + cached_y.shape[-1]
+
+        if cached_start <= start and stop <= cached_stop:
+            with self.__lock:
+                self.hits += 1
+        else:
+            if stop < cached_start or cached_stop < start:
+                cached_start, cached_stop, cached_y = start, start, np.empty(0)
+
+            with self.__lock:
+                if cached_y.size > 0:
+                    self.partial_hits += 1
+                else:
+                    self.misses += 1
+
+            parts = [cached_y] if cached_y.size > 0 else []
+            if start < cached_start:
+                parts.insert(0, self.__evaluate(function, start, cached_start, delta))
+                cached_start = start
+            if cached_stop < stop:
+                parts.append(self.__evaluate(function, cached_stop, stop, delta))
+                cached_stop = stop
+
+            cached_y = np.concatenate(parts, axis=-1)
+            cached_y.flags.writeable = False
+
+        with self.__lock:
+            if self.__check_version() != version:
+                # The registry changed during the evaluation, so the samples may be stale.
+                return np.arange(start, stop) * delta, cached_y[..., start - cached_start:stop - cached_start]
+
+            # Another thread may have stored a run for the same grid while this one was evaluating, so the
+            # two runs are merged instead of the last one replacing the other.
+            previous_start, previous_y = self.__entries.pop(entry_key, (0, np.empty(0)))
+            self.cached_points -= previous_y.size
+            cached_start, cached_y = merge_runs(previous_start, previous_y, cached_start, cached_y)
+
+            if cached_y.size > self.max_points:
+                cached_start, cached_y = start, cached_y[..., start - cached_start:stop - cached_start].copy()
+                cached_y.flags.writeable = False
+
+            self.__entries[entry_key] = (cached_start, cached_y)
+            self.cached_points += cached_y.size
+            while self.cached_points > self.max_points and len(self.__entries) > 1:
+                _, (_, evicted_y) = self.__entries.popitem(last=False)
+                self.cached_points -= evicted_y.size
+
+        x_values = np.arange(start, stop) * delta
+        y_values = cached_y[..., start - cached_start:stop - cached_start]
+        return x_values, y_values
+
+    def peek(self, key, min_x=0, max_x=1, n_points=50000):
+        """ Returns the samples of the range [min_x, max_x) that are already cached, without evaluating any.
+
+        The grid is the one `sample` would use for the same arguments. The statistics are not updated.
+
+        :return: The cached grid points within the range, and the corresponding read-only y-values, both empty
+         if nothing is cached.
+        """
+        if min_x > max_x:
+            min_x, max_x = max_x, min_x
+
+        if min_x == max_x:
+            return np.empty(0), np.empty(0)
+
+        delta, start, stop = get_grid(min_x, max_x, n_points)
+        with self.__lock:
+            self.__check_version()
+            cached_start, cached_y = self.__entries.get((key, delta), (start, np.empty(0)))
+
+        start = max(start, cached_start)
+        stop = min(stop, cached_start + cached_y.shape[-1])
+        if start >= stop:
+            return np.empty(0), np.empty(0)
+        return np.arange(start, stop) * delta, cached_y[..., start - cached_start:stop - cached_start]
+
+    def clear(self):
+        """ Removes all samples and resets the statistics. """
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.partial_hits = 0
+            self.misses = 0
+            self.evaluated_points = 0
+            self.cached_points = 0
+
+    def __check_version(self):
+        """ Empties the cache if the registry of functions changed since it was filled, the lock must be held.
+
+        :return: The current version of the registry.
+        """
+        if self.__version != get_version():
+            self.__entries.clear()
+            self.cached_points = 0
+            self.__version = get_version()
+        return self.__version
+
+    def __evaluate(self, function, start, stop, delta):
+        y_values = np.asarray(function(np.arange(start, stop) * delta), dtype=float)
+        # Counted once the evaluation succeeded, so cancelled or failed work is not reported.
+        with self.__lock:
+            self.evaluated_points += stop - start
+        return y_values
+
+
+def merge_runs(first_start, first_y, second_start, second_y):
+    """ Merges two runs of samples on the same grid, given by their first grid index and their y-values.
+
+    The samples of the second run are kept where the runs overlap. If there is a gap between the runs,
+    they can not be stored as one and the second run is returned alone.
+
+    :return: The first grid index and the y-values of the merged run.
+    """
+    first_stop = first_start + first_y.shape[-1]
+    second_stop = second_start + second_y.shape[-1]
+    if first_y.size == 0 or second_stop < first_start or first_stop < second_start:
+        return second_start, second_y
+    if first_start >= second_start and first_stop <= second_stop:
+        return second_start, second_y
+
+    parts = [second_y]
+    if first_start < second_start:
+        parts.insert(0, first_y[..., :second_start - first_start])
+    if second_stop < first_stop:
+        parts.append(first_y[..., second_stop - first_start:])
+    merged_y = np.concatenate(parts, axis=-1)
+    merged_y.flags.writeable = False
+    return min(first_start, second_start), merged_y
+
+
+def get_grid(min_x, max_x, n_points):
+    """ The spacing of the sample grid of a range, and the indices of its first and past-the-end points. """
+    delta = grid_step((max_x - min_x) / n_points)
+    start = math.ceil(min_x / delta)
+    return delta, start, max(start, math.ceil(max_x / delta))
+
+
+def grid_step(delta):
+    """ Rounds a grid spacing up to a power of two, so that nearby spacings map to the same grid. """
+    return 2.0 ** math.ceil(math.log2(delta))
+
+
+expression_cache = ExpressionCache()
+
+sample_cache = SampleCache()
@@ -0,0 +1,196 @@
+import functools
+import keyword
+import math
+
+from compiler import strip_parentheses
+from expr_parser.dag import build_dag
+from expr_parser.nodes import *
+from expr_parser.optimizer import optimize as optimize_ast
+
+from expr_parser.tokens import *
+
+BINARY_OPERATOR_SOURCES = {
+    TokenKind.PLUS: '+',
+    TokenKind.MINUS: '-',
+    TokenKind.STAR: '*',
+    TokenKind.SLASH: '/',
+    TokenKind.CARET: '**',
+}
+
+# CPython limits how deeply expressions can be nested in source code, so subexpressions taller than this are
+# assigned to a local variable instead of being written inline.
+MAX_INLINE_HEIGHT = 50
+
+
+class GeneratedExpression:
+    def __init__(self, ast, optimize=True, cse=True):
+        """ Generates the Python source of a function that evaluates an AST object, and compiles it.
+
+        The function is straight-line code, e.g. `return ((x * x) + 3.0) / x`, so evaluating it runs CPython
+        bytecode with no tree walk and no closure calls, or one fused NumPy expression when the arguments
+        are arrays. The code object is cached by source, so expressions that generate the same source are
+        compiled once.
+
+        Only generated names, sanitized identifiers and the `repr` of finite floats are written to the source.
+        Other values, like inf or the registered functions, are passed to the code through its global names.
+
+        :type ast: AST
+        :param ast: An abstract syntax tree representing an expression, it must contain no errors.
+        :param optimize: Whether to simplify the tree with `expr_parser.optimizer.optimize` first.
+        :param cse: Whether to compute common subexpressions once, in a local variable.
+        """
+        self.ast = ast
+        self.identifiers = ast.identifiers
+        self.parameters = get_parameter_names(ast.identifiers)
+        dag = None
+        if optimize:
+            ast = optimize_ast(ast)
+        if cse:
+            dag = build_dag(ast)
+            ast = dag.ast
+
+        self.source, namespace = generate_source(ast.main_expression, self.parameters, dag)
+        namespace['__builtins__'] = {}
+        exec(compile_source(self.source), namespace)
+        self.function = namespace['expression']
+        self.__renamed = any(name != parameter for name, parameter in self.parameters.items())
+
+    def eval(self, **variables):
+        """ Evaluates the generated function with the given identifier values, see `CompiledExpression.eval`.
+
+        :param variables: The values to substitute in the place of the identifiers, floats or NumPy arrays.
+        :return: The result of the evaluation.
+        """
+        if not variables.keys() <= self.identifiers:
+            name = next(name for name in variables if name not in self.identifiers)
+            raise KeyError(f"Evaluation Error: Invalid Identifier \'{name}\'")
+
+        if self.__renamed:
+            variables = {self.parameters[name]: value for name, value in variables.items()}
+        try:
+            return self.function(**variables)
+        except TypeError:
+            # The generated function takes every identifier as a parameter, so a missing one is a TypeError.
+            for name in sorted(self.identifiers):
+                if self.parameters[name] not in variables:
+                    raise Exception(f"Evaluation Error: Invalid identifier {name}")
+            raise
+
+
+def generate(ast, optimize=True, cse=True):
+    """ Generates and compiles the Python source of an AST object, see `GeneratedExpression`.
+
+    :type ast: AST
+    :rtype: GeneratedExpression
+    """
+    return GeneratedExpression(ast, optimize, cse)
+
+
+@functools.lru_cache(maxsize=256)
+def compile_source(source):
+    """ Compiles generated source into a code object, once per distinct source. """
+    return compile(source, '<expression>', 'exec')
+
+
+def get_parameter_names(identifiers):
+    """ Maps each identifier to the name of its parameter in the generated source.
+
+    Identifiers are kept as they are when they are plain ASCII Python identifiers. Keywords, identifiers with
+    non-ASCII letters, which Python would normalize, and identifiers starting with '_', which is reserved for
+    generated names, are renamed to _v0, _v1, ...
+
+    :return: A dict from identifier to parameter name, in sorted order of the identifiers.
+    """
+    parameters = {}
+    for i, name in enumerate(sorted(identifiers)):
+        if name.isascii() and name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_'):
+            parameters[name] = name
+        else:
+            parameters[name] = f'_v{i}'
+    return parameters
+
+
+def generate_source(node, parameters, dag=None):
+    """ Generates the source of a function `expression` that evaluates the subtree starting from `node`.
+
+    The tree is walked in post-order with an explicit stack instead of recursion. Each node is written inline
+    in the expression of its parent, unless it is shared in `dag` or the expression would be nested more than
+    `MAX_INLINE_HEIGHT` levels deep, in which case it is assigned to a local variable first.
+
+    :param node: The root of the subtree.
+    :param parameters: The parameter names of the identifiers, see `get_parameter_names`.
+    :param dag: The `ExpressionDAG` the node belongs to, if any.
+    :return: The source, and the dict of the global names it refers to.
+    """
+    namespace = {}
+    bound_names = {}
+    lines = []
+    # The source of each node and the height of its expression, by node identity.
+    expressions = {}
+
+    def bind(value, prefix):
+        if id(value) not in bound_names:
+            bound_names[id(value)] = f'{prefix}{len(bound_names)}'
+            namespace[bound_names[id(value)]] = value
+        return bound_names[id(value)]
+
+    stack = [(strip_parentheses(node), False)]
+    while len(stack) > 0:
+        node, visited = stack.pop()
+        if id(node) in expressions:
+            continue
+
+        node_type = type(node)
+        if node_type is NumberExpressionNode:
+            value = float(node.number_token.value)
+            if math.isfinite(value):
+                source = repr(value) if value >= 0 and math.copysign(1.0, value) > 0 else f'({value!r})'
+            else:
+                source = bind(value, '_c')
+            expressions[id(node)] = (source, 1)
+            continue
+        if node_type is IdentifierNode:
+            expressions[id(node)] = (parameters[node.identifier_token.value], 1)
+            continue
+
+        if node_type is BinaryExpressionNode:
+            children = [node.left_expression, node.right_expression]
+        elif node_type is UnaryExpressionNode:
+            children = [node.operand]
+        elif node_type is FunctionCallNode:
+            children = list(node.arguments)
+        else:
+            raise Exception(f"Evaluation Error: Invalid node type \'{node_type.__name__}\'")
+        children = [strip_parentheses(child) for child in children]
+
+        if not visited:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+
+        operands = [expressions[id(child)][0] for child in children]
+        height = 1 + max(expressions[id(child)][1] for child in children)
+        if node_type is BinaryExpressionNode:
+            try:
+                operator_source = BINARY_OPERATOR_SOURCES[node.operator_token.kind]
+            except KeyError:
+                raise Exception(f"Evaluation Error: Invalid binary operator \'{node.operator_token.kind.name}\'")
+            source = f'({operands[0]} {operator_source} {operands[1]})'
+        elif node_type is UnaryExpressionNode:
+            if node.operator_token.kind == TokenKind.PLUS:
+                source, height = operands[0], height - 1
+            elif node.operator_token.kind == TokenKind.MINUS:
+                source = f'(-{operands[0]})'
+            else:
+                raise Exception(f"Evaluation Error: Invalid unary operator \'{node.operator_token.kind.name}\'")
+        else:
+            source = f'{bind(node.function, "_f")}({", ".join(operands)})'
+
+        if height >= MAX_INLINE_HEIGHT or (dag is not None and dag.is_shared(node)):
+            lines.append(f'    _t{len(lines)} = {source}')
+            source, height = f'_t{len(lines) - 1}', 1
+        expressions[id(node)] = (source, height)
+
+    lines.append(f'    return {expressions[id(node)][0]}')
+    header = f'def expression({", ".join(parameters.values())}):'
+    return '\n'.join([header] + lines) + '\n', namespace
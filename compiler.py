@@ -0,0 +1,374 @@
+import operator
+
+from expr_parser.dag import build_dag
+from expr_parser.nodes import *
+from expr_parser.optimizer import optimize as optimize_ast
+
+from expr_parser.tokens import *
+
+BINARY_OPERATORS = {
+    TokenKind.PLUS: operator.add,
+    TokenKind.MINUS: operator.sub,
+    TokenKind.STAR: operator.mul,
+    TokenKind.SLASH: operator.truediv,
+    TokenKind.CARET: operator.pow,
+}
+
+# Evaluating nested closures takes a few Python frames per level of the tree, so deeper trees are compiled
+# into a flat program that does not come close to the recursion limit.
+MAX_CLOSURE_DEPTH = 200
+
+
+class CompiledExpression:
+    def __init__(self, ast, optimize=True, cse=True):
+        """ Compiles an expression represented by an AST object into nested Python closures.
+
+        The tree is walked exactly once, at construction-time. Evaluating the compiled form calls
+        the closures directly, so no type or operator dispatch happens per evaluation. Trees deeper than
+        `MAX_CLOSURE_DEPTH` are compiled into a flat program instead, see `compile_program`.
+
+        :type ast: AST
+        :param ast: An abstract syntax tree representing an expression, it must contain no errors.
+        :param optimize: Whether to simplify the tree with `expr_parser.optimizer.optimize` before compiling it.
+        :param cse: Whether to share common subexpressions, see `expr_parser.dag.ExpressionDAG`. The graph
+         is kept in `self.dag` and reports how many nodes were deduplicated.
+        """
+        self.ast = ast
+        self.identifiers = ast.identifiers
+        self.dag = None
+        if optimize:
+            ast = optimize_ast(ast)
+        if cse:
+            self.dag = build_dag(ast)
+            ast = self.dag.ast
+
+        root_node = ast.main_expression
+        if get_height(root_node) > MAX_CLOSURE_DEPTH:
+            program = compile_program([root_node])
+            self.__function = lambda variables: program(variables)[0]
+        else:
+            self.__function = compile_node(root_node, self.dag)
+
+    def eval(self, **variables):
+        """ Evaluates the compiled expression with the given identifier values.
+
+        The values can be floats or NumPy arrays, in which case the whole expression is evaluated
+        as array operations.
+
+        :param variables: The values to substitute in the place of the identifiers.
+        :return: The result of the evaluation.
+        """
+        if not variables.keys() <= self.identifiers:
+            name = next(name for name in variables if name not in self.identifiers)
+            raise KeyError(f"Evaluation Error: Invalid Identifier \'{name}\'")
+
+        try:
+            return self.__function(variables)
+        except KeyError as e:
+            raise Exception(f"Evaluation Error: Invalid identifier {e.args[0]}")
+
+
+class CompiledExpressionGroup:
+    def __init__(self, asts, optimize=True, cse=True):
+        """ Compiles several expressions so that they are evaluated together, in a single pass.
+
+        All trees are hash-consed into one `expr_parser.dag.ExpressionDAG`, so a subexpression that appears
+        in several of them, e.g. x^2 in both x^2+1 and x^2-1, is computed once per evaluation of the group.
+
+        :param asts: The AST objects of the expressions, none of them may contain errors.
+        :param optimize: Whether to simplify the trees before compiling them.
+        :param cse: Whether to share common subexpressions within and across the expressions.
+        """
+        self.asts = list(asts)
+        self.identifiers = set().union(*(ast.identifiers for ast in self.asts))
+        self.dag = None
+        if optimize:
+            asts = [optimize_ast(ast) for ast in self.asts]
+        else:
+            asts = self.asts
+        if cse:
+            self.dag = build_dag()
+            asts = [self.dag.add(ast) for ast in asts]
+
+        root_nodes = [ast.main_expression for ast in asts]
+        if any(get_height(root_node) > MAX_CLOSURE_DEPTH for root_node in root_nodes):
+            self.__function = compile_program(root_nodes)
+        else:
+            compiled = {}
+            functions = [compile_node(root_node, self.dag, compiled) for root_node in root_nodes]
+            self.__function = lambda variables: [function(variables) for function in functions]
+
+    def __len__(self):
+        return len(self.asts)
+
+    def eval(self, **variables):
+        """ Evaluates all expressions of the group with the given identifier values.
+
+        :param variables: The values to substitute in the place of the identifiers, see `CompiledExpression.eval`.
+        :return: The list of the results, in the order of the expressions.
+        """
+        if not variables.keys() <= self.identifiers:
+            name = next(name for name in variables if name not in self.identifiers)
+            raise KeyError(f"Evaluation Error: Invalid Identifier \'{name}\'")
+
+        try:
+            return self.__function(variables)
+        except KeyError as e:
+            raise Exception(f"Evaluation Error: Invalid identifier {e.args[0]}")
+
+
+def compile_ast(ast, optimize=True, cse=True):
+    """ Compiles an AST object into a reusable `CompiledExpression`.
+
+    :type ast: AST
+    :param optimize: Whether to simplify the tree before compiling it.
+    :param cse: Whether to evaluate common subexpressions only once.
+    :rtype: CompiledExpression
+    """
+    return CompiledExpression(ast, optimize, cse)
+
+
+def compile_group(asts, optimize=True, cse=True):
+    """ Compiles several AST objects into a `CompiledExpressionGroup` that evaluates them together.
+
+    :param asts: AST objects, or `CompiledExpression` objects whose original trees are used.
+    :rtype: CompiledExpressionGroup
+    """
+    asts = [ast.ast if isinstance(ast, CompiledExpression) else ast for ast in asts]
+    return CompiledExpressionGroup(asts, optimize, cse)
+
+
+def as_compiled(expression, optimize=True, cse=True):
+    """ Compiles an AST object, unless `expression` is already a `CompiledExpression`.
+
+    :param expression: An AST object or a `CompiledExpression`.
+    :rtype: CompiledExpression
+    """
+    if isinstance(expression, CompiledExpression):
+        return expression
+    return compile_ast(expression, optimize, cse)
+
+
+def compile_node(node, dag=None, compiled=None):
+    """ Recursively turns the subtree starting from `node` into a closure.
+
+    The recursion is as deep as the subtree, which is why deep trees go through `compile_program` instead.
+
+    :param node: The root of the subtree to compile.
+    :param dag: The `ExpressionDAG` the node belongs to, if any. Shared nodes of the graph are compiled
+     once and their value is computed once per evaluation.
+    :param compiled: The closures compiled so far, keyed by node identity.
+    :return: A function that takes a dict of identifier values and returns the value of the subtree.
+    """
+    if compiled is None:
+        compiled = {}
+
+    node = strip_parentheses(node)
+    try:
+        return compiled[id(node)]
+    except KeyError:
+        pass
+
+    function = compile_node_function(node, dag, compiled)
+    if dag is not None and dag.is_shared(node) and isinstance(node, (BinaryExpressionNode, UnaryExpressionNode,
+                                                                     FunctionCallNode)):
+        function = memoize(function, id(node))
+
+    compiled[id(node)] = function
+    return function
+
+
+def compile_node_function(node, dag, compiled):
+    if isinstance(node, NumberExpressionNode):
+        value = node.number_token.value
+        return lambda variables: value
+    if isinstance(node, IdentifierNode):
+        name = node.identifier_token.value
+        return lambda variables: variables[name]
+
+    if isinstance(node, BinaryExpressionNode):
+        try:
+            op = BINARY_OPERATORS[node.operator_token.kind]
+        except KeyError:
+            raise Exception(f"Evaluation Error: Invalid binary operator \'{node.operator_token.kind.name}\'")
+
+        left = compile_node(node.left_expression, dag, compiled)
+        right = compile_node(node.right_expression, dag, compiled)
+
+        if isinstance(strip_parentheses(node.right_expression), NumberExpressionNode):
+            right_value = strip_parentheses(node.right_expression).number_token.value
+            return lambda variables: op(left(variables), right_value)
+        if isinstance(strip_parentheses(node.left_expression), NumberExpressionNode):
+            left_value = strip_parentheses(node.left_expression).number_token.value
+            return lambda variables: op(left_value, right(variables))
+        return lambda variables: op(left(variables), right(variables))
+    elif isinstance(node, UnaryExpressionNode):
+        operand = compile_node(node.operand, dag, compiled)
+        if node.operator_token.kind == TokenKind.PLUS:
+            return operand
+        elif node.operator_token.kind == TokenKind.MINUS:
+            return lambda variables: -operand(variables)
+        else:
+            raise Exception(f"Evaluation Error: Invalid unary operator \'{node.operator_token.kind.name}\'")
+    elif isinstance(node, FunctionCallNode):
+        function = node.function
+        arguments = [compile_node(argument, dag, compiled) for argument in node.arguments]
+        if len(arguments) == 1:
+            argument = arguments[0]
+            return lambda variables: function(argument(variables))
+        return lambda variables: function(*[argument(variables) for argument in arguments])
+
+
+def compile_program(nodes):
+    """ Compiles the subtrees starting from `nodes` into a flat program, evaluated in a single loop.
+
+    The program has one step per distinct node, in post-order, and each step reads the values of its
+    operands from the list of values computed by the previous steps. Evaluating it takes the same number
+    of Python frames whatever the depth of the trees, unlike nested closures. Nodes that appear in several
+    places, e.g. shared nodes of an `ExpressionDAG`, get a single step, so they are computed once.
+
+    :param nodes: The roots of the subtrees to compile.
+    :return: A function that takes a dict of identifier values and returns the list of values of the subtrees.
+    """
+    return compile_steps(*flatten(nodes))
+
+
+def flatten(nodes):
+    """ Lists the steps of the program that computes the subtrees starting from `nodes`, see `compile_program`.
+
+    Each step is a tuple whose first item is the type of the node it computes, followed by plain values:
+    (NumberExpressionNode, value), (IdentifierNode, name), (BinaryExpressionNode, operator kind, left, right),
+    (UnaryExpressionNode, operand) for a negation, or (FunctionCallNode, function, operands), where left,
+    right, operand and operands are indices of earlier steps. Unlike the tree, the steps can be pickled
+    whatever its depth, e.g. to be sent to worker processes.
+
+    :param nodes: The roots of the subtrees.
+    :return: The list of steps, and the index of the step computing each subtree.
+    """
+    steps = []
+    # The index in the list of steps of each node, by node identity. Parenthesized expressions and unary pluses
+    # share the index of their operand.
+    slots = {}
+    for root_node in nodes:
+        stack = [(root_node, False)]
+        while len(stack) > 0:
+            node, visited = stack.pop()
+            if id(node) in slots:
+                continue
+
+            node_type = type(node)
+            if node_type is NumberExpressionNode:
+                steps.append((NumberExpressionNode, node.number_token.value))
+            elif node_type is IdentifierNode:
+                steps.append((IdentifierNode, node.identifier_token.value))
+            elif not visited:
+                stack.append((node, True))
+                if node_type is BinaryExpressionNode:
+                    stack.append((node.right_expression, False))
+                    stack.append((node.left_expression, False))
+                elif node_type is UnaryExpressionNode:
+                    stack.append((node.operand, False))
+                elif node_type is FunctionCallNode:
+                    stack.extend((argument, False) for argument in reversed(node.arguments))
+                else:
+                    stack.append((node.main_expression, False))
+                continue
+            elif node_type is BinaryExpressionNode:
+                steps.append((BinaryExpressionNode, node.operator_token.kind, slots[id(node.left_expression)],
+                              slots[id(node.right_expression)]))
+            elif node_type is UnaryExpressionNode:
+                if node.operator_token.kind == TokenKind.PLUS:
+                    slots[id(node)] = slots[id(node.operand)]
+                    continue
+                if node.operator_token.kind != TokenKind.MINUS:
+                    raise Exception(f"Evaluation Error: Invalid unary operator \'{node.operator_token.kind.name}\'")
+                steps.append((UnaryExpressionNode, slots[id(node.operand)]))
+            elif node_type is FunctionCallNode:
+                steps.append((FunctionCallNode, node.function, [slots[id(argument)] for argument in node.arguments]))
+            else:
+                slots[id(node)] = slots[id(node.main_expression)]
+                continue
+
+            slots[id(node)] = len(steps) - 1
+
+    return steps, [slots[id(root_node)] for root_node in nodes]
+
+
+def compile_steps(steps, outputs):
+    """ Turns the steps listed by `flatten` into a function that runs them in a single loop.
+
+    :param steps: The steps of the program.
+    :param outputs: The indices of the steps whose values are returned.
+    :return: A function that takes a dict of identifier values and returns the list of the values of the outputs.
+    """
+    functions = []
+    for step in steps:
+        step_type = step[0]
+        if step_type is NumberExpressionNode:
+            functions.append(lambda values, variables, value=step[1]: value)
+        elif step_type is IdentifierNode:
+            functions.append(lambda values, variables, name=step[1]: variables[name])
+        elif step_type is BinaryExpressionNode:
+            try:
+                op = BINARY_OPERATORS[step[1]]
+            except KeyError:
+                raise Exception(f"Evaluation Error: Invalid binary operator \'{step[1].name}\'")
+            functions.append(lambda values, variables, op=op, left=step[2], right=step[3]:
+                             op(values[left], values[right]))
+        elif step_type is UnaryExpressionNode:
+            functions.append(lambda values, variables, operand=step[1]: -values[operand])
+        else:
+            functions.append(lambda values, variables, function=step[1], operands=step[2]:
+                             function(*[values[operand] for operand in operands]))
+
+    def run(variables):
+        values = []
+        for function in functions:
+            values.append(function(values, variables))
+        return [values[slot] for slot in outputs]
+
+    return run
+
+
+def get_height(node):
+    """ The number of nodes on the longest path from `node` down to a leaf, parentheses excluded. """
+    height = 0
+    stack = [(node, 1)]
+    while len(stack) > 0:
+        node, depth = stack.pop()
+        node_type = type(node)
+        if node_type is BinaryExpressionNode:
+            stack.append((node.left_expression, depth + 1))
+            stack.append((node.right_expression, depth + 1))
+        elif node_type is UnaryExpressionNode:
+            stack.append((node.operand, depth + 1))
+        elif node_type is FunctionCallNode:
+            stack.extend((argument, depth + 1) for argument in node.arguments)
+        elif node_type is ParenthesizedExpressionNode:
+            stack.append((node.main_expression, depth))
+        elif depth > height:
+            height = depth
+    return height
+
+
+def memoize(function, slot):
+    """ Wraps a closure so that its value is computed at most once per evaluation.
+
+    The value is stored in the dict of identifier values under the integer key `slot`, which can not
+    collide with identifier names. Each call to `CompiledExpression.eval` gets a fresh dict.
+    """
+    missing = object()
+
+    def memoized(variables):
+        value = variables.get(slot, missing)
+        if value is missing:
+            value = variables[slot] = function(variables)
+        return value
+
+    return memoized
+
+
+def strip_parentheses(node):
+    while isinstance(node, ParenthesizedExpressionNode):
+        node = node.main_expression
+    return node
@@ -1,12 +1,27 @@
-import multiprocessing
+import atexit
 import functools
+import math
 
-import numpy as np
+from compiler import (BINARY_OPERATORS, CompiledExpression, as_compiled, compile_ast, compile_group, compile_steps,
+                      flatten)
+from expr_parser.AST import AST
+from expr_parser.dag import build_dag
+from expr_parser.functions import Function, get_constant, get_function, get_version
+from expr_parser.optimizer import optimize as optimize_ast
+from lazy import LazyModule
 
 from expr_parser.nodes import *
 
 from expr_parser.tokens import *
 
+np = LazyModule('numpy')
+
+# Marks the point where the evaluator negates the value of the operand of a unary minus.
+NEGATION = object()
+
+# How the vectorized evaluators handle division by zero, overflow and invalid operations, see `evaluate_with_policy`.
+ERROR_POLICIES = ('raise', 'mask', 'clip')
+
 
 class Evaluator:
     def __init__(self, ast):
@@ -33,7 +48,7 @@ class Evaluator:
         if name in self.ast.identifiers:
             self.variable_map[name] = val
         else:
-            raise KeyError(f"Evaluation Error: Invalid Identifier \'{name}\'")
+            raise get_identifier_error(name)
 
     def eval(self):
         """ An interface method to evaluate the AST provided at construction-time.
@@ -41,47 +56,112 @@ class Evaluator:
         :rtype float
         :return: The result of the evaluation.
         """
-        return self.__eval(self.ast.main_expression)
+        return self.__eval(self.ast.main_expression, self.variable_map)
+
+    def eval_many(self, bindings, errors='mask'):
+        """ Evaluates the AST for many bindings of its identifiers at once.
+
+        The bindings are given as columns, one array of values per identifier, and the tree is walked once
+        with each identifier bound to its whole column, so every operation is applied to all rows together.
+        The identifiers are validated once for the whole batch.
+
+        :param bindings: A dict mapping identifiers to arrays of values, or a NumPy structured array with one
+         field per identifier. The columns must have the same length, or broadcast to a common shape.
+         Without any column, e.g. for a constant expression, the batch is a single row.
+        :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+        :rtype: np.ndarray
+        :return: A float array holding the value of the expression for each row of the bindings, with at least
+         one dimension, so it has one value even if there are no columns or they are all scalars.
+        """
+        check_error_policy(errors)
+        if isinstance(bindings, np.ndarray) and bindings.dtype.names is not None:
+            bindings = {name: bindings[name] for name in bindings.dtype.names}
+
+        for name in bindings:
+            if name not in self.ast.identifiers:
+                raise get_identifier_error(name)
+        for name in self.ast.identifiers:
+            if name not in bindings:
+                raise Exception(f"Evaluation Error: Invalid identifier {name}")
+
+        variables = {name: np.asarray(values, dtype=float) for name, values in bindings.items()}
+        shape = np.broadcast_shapes((1,), *(values.shape for values in variables.values()))
+
+        def evaluate_with_numpy_numbers():
+            numpy_ast = with_numpy_numbers(self.ast)
+            return [Evaluator(numpy_ast).__eval(numpy_ast.main_expression, variables)]
+
+        return evaluate_with_policy(lambda: [self.__eval(self.ast.main_expression, variables)],
+                                    evaluate_with_numpy_numbers, shape, errors)[0]
+
+    def __eval(self, node, variables):
+        """ Internal utility that evaluates the value of a tree starting from the node `node`.
+
+        The tree is walked in post-order with an explicit stack instead of recursion, so the depth of the
+        tree is not limited by Python's recursion limit. The operator token of a binary expression, and the
+        function of a call, are pushed below their operands, and applied to their values once all of them have
+        been evaluated. Errors of function calls name the function, see `Function.__call__`.
 
-    def __eval(self, node):
-        """ Internal recursive utility that evaluates the value of a tree starting from the node `node`.
-        
         :param node: The root of the subtree to evaluate.
+        :param variables: A dict mapping identifiers to their values.
         :return: A float value of the operations represented by the subtree.
         """
-        if isinstance(node, NumberExpressionNode):
-            return node.number_token.value
-        if isinstance(node, IdentifierNode):
-            try:
-                return self.variable_map[node.identifier_token.value]
-            except KeyError:
-                raise Exception(f"Evaluation Error: Invalid identifier {node.identifier_token.value}")
-
-        if isinstance(node, ParenthesizedExpressionNode):
-            return self.__eval(node.main_expression)
-        elif isinstance(node, BinaryExpressionNode):
-            left = self.__eval(node.left_expression)
-            right = self.__eval(node.right_expression)
-
-            if node.operator_token.kind == TokenKind.PLUS:
-                return left + right
-            elif node.operator_token.kind == TokenKind.MINUS:
-                return left - right
-            elif node.operator_token.kind == TokenKind.STAR:
-                return left * right
-            elif node.operator_token.kind == TokenKind.SLASH:
-                return left / right
-            elif node.operator_token.kind == TokenKind.CARET:
-                return left ** right
-            else:
-                raise Exception(f"Evaluation Error: Invalid binary operator \'{node.operator_token.kind.name}\'")
-        elif isinstance(node, UnaryExpressionNode):
-            if node.operator_token.kind == TokenKind.PLUS:
-                return self.__eval(node.operand)
-            elif node.operator_token.kind == TokenKind.MINUS:
-                return -self.__eval(node.operand)
-            else:
-                raise Exception(f"Evaluation Error: Invalid unary operator \'{node.operator_token.kind.name}\'")
+        values = []
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            node_type = type(node)
+
+            if node_type is BinaryExpressionNode:
+                stack.append(node.operator_token)
+                stack.append(node.right_expression)
+                stack.append(node.left_expression)
+            elif node_type is NumberExpressionNode:
+                values.append(node.number_token.value)
+            elif node_type is IdentifierNode:
+                try:
+                    values.append(variables[node.identifier_token.value])
+                except KeyError:
+                    raise Exception(f"Evaluation Error: Invalid identifier {node.identifier_token.value}")
+            elif node_type is Token:
+                right = values.pop()
+                try:
+                    values[-1] = BINARY_OPERATORS[node.kind](values[-1], right)
+                except KeyError:
+                    raise Exception(f"Evaluation Error: Invalid binary operator \'{node.kind.name}\'")
+            elif node_type is ParenthesizedExpressionNode:
+                stack.append(node.main_expression)
+            elif node_type is FunctionCallNode:
+                stack.append(node.function)
+                stack.extend(reversed(node.arguments))
+            elif node_type is Function:
+                if node.arity == 1:
+                    values[-1] = node(values[-1])
+                else:
+                    arguments = values[-node.arity:]
+                    del values[-node.arity:]
+                    values.append(node(*arguments))
+            elif node_type is UnaryExpressionNode:
+                if node.operator_token.kind == TokenKind.MINUS:
+                    stack.append(NEGATION)
+                elif node.operator_token.kind != TokenKind.PLUS:
+                    raise Exception(f"Evaluation Error: Invalid unary operator \'{node.operator_token.kind.name}\'")
+                stack.append(node.operand)
+            elif node is NEGATION:
+                values[-1] = -values[-1]
+
+        return values.pop()
+
+
+def get_identifier_error(name):
+    """ The KeyError raised when `name` is not an identifier of the expression being evaluated.
+
+    The names of constants, like e and pi, are replaced by their values while parsing, so they are never
+    identifiers. The error says so, instead of reporting them as unknown.
+    """
+    if get_constant(name) is not None:
+        return KeyError(f"Evaluation Error: \'{name}\' is a constant, not an identifier")
+    return KeyError(f"Evaluation Error: Invalid Identifier \'{name}\'")
 
 
 def get_y(evaluator, x_point):
@@ -89,14 +169,355 @@ def get_y(evaluator, x_point):
     return evaluator.eval()
 
 
-def evaluate_in_range(ast, min_x=0, max_x=1, delta=0.0, n_points=50000):
+def vectorize(ast, optimize=True, errors='mask'):
+    """ Compiles an AST object into a function of a whole array of x-values.
+
+    The array is bound to the identifier `x` and the compiled expression is evaluated once per call,
+    so every node of the tree is a single NumPy operation over the full array instead of a walk per point.
+
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
+    :param optimize: Whether to simplify the tree before compiling it.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :return: A function that maps an array of x-values to a float array of y-values of the same shape.
+    """
+    check_error_policy(errors)
+    compiled = as_compiled(ast, optimize)
+    uses_x = 'x' in compiled.identifiers
+
+    @functools.cache
+    def compile_with_numpy_numbers():
+        return compile_ast(with_numpy_numbers(compiled.ast), optimize)
+
+    def evaluate(x_values):
+        x_values = np.asarray(x_values, dtype=float)
+        variables = {'x': x_values} if uses_x else {}
+        return evaluate_with_policy(lambda: [compiled.eval(**variables)],
+                                    lambda: [compile_with_numpy_numbers().eval(**variables)],
+                                    x_values.shape, errors)[0]
+
+    return evaluate
+
+
+def vectorize_many(asts, optimize=True, errors='mask'):
+    """ Compiles several AST objects into one function of a whole array of x-values.
+
+    The expressions are compiled as a `compiler.CompiledExpressionGroup`, so they share one pass over the
+    x-values and the subexpressions they have in common are evaluated once.
+
+    :param asts: The AST objects to evaluate, or their `CompiledExpression` objects.
+    :param optimize: Whether to simplify the trees before compiling them.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :return: A function that maps an array of x-values to a float array with one row of y-values per expression.
+    """
+    check_error_policy(errors)
+    group = compile_group(asts, optimize)
+    uses_x = 'x' in group.identifiers
+
+    @functools.cache
+    def compile_with_numpy_numbers():
+        return compile_group([with_numpy_numbers(ast) for ast in group.asts], optimize)
+
+    def evaluate(x_values):
+        x_values = np.asarray(x_values, dtype=float)
+        variables = {'x': x_values} if uses_x else {}
+        return evaluate_with_policy(lambda: group.eval(**variables),
+                                    lambda: compile_with_numpy_numbers().eval(**variables), x_values.shape, errors)
+
+    return evaluate
+
+
+def evaluate_vectorized(ast, x_values, optimize=True, errors='mask'):
+    """ Evaluates an AST object once for a whole array of x-values, see `vectorize`.
+
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
+    :param x_values: The points on the x-axis to evaluate the expression at.
+    :param optimize: Whether to simplify the tree before evaluating it.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :rtype: np.ndarray
+    :return: The y-values corresponding to `x_values`, as a float array of the same shape.
+    """
+    return vectorize(ast, optimize, errors)(x_values)
+
+
+def check_error_policy(errors):
+    if errors not in ERROR_POLICIES:
+        raise ValueError(f"Evaluation Error: Invalid error policy \'{errors}\', expected 'raise', 'mask' or 'clip'")
+
+
+def evaluate_with_policy(function, fallback, shape, errors='mask'):
+    """ Evaluates expressions over arrays, handling floating-point errors according to the policy `errors`.
+
+    - 'raise': the first division by zero, overflow or invalid operation raises an exception.
+    - 'mask': they give nan. Infinite results are replaced by nan as well, so plots show a gap there.
+    - 'clip': infinite results are replaced by the largest finite floats of the same sign, nan is kept.
+
+    The checks are done by NumPy for whole arrays at once, under `np.errstate`. Constant subexpressions,
+    like 1/0 in x + 1/0 or log(0), are computed with Python floats instead, which raise or give complex numbers.
+    In that case the expressions are evaluated again by `fallback`, with NumPy numbers. If they still give
+    complex numbers, an exception is raised.
+
+    :param function: Returns the list of the values of the expressions.
+    :param fallback: Does the same, with the numbers of the expressions replaced, see `with_numpy_numbers`.
+    :param shape: The shape that the values are broadcast to.
+    :param errors: 'raise', 'mask' or 'clip'.
+    :rtype: np.ndarray
+    :return: A float array of shape (number of expressions, *shape).
+    """
+    state = 'raise' if errors == 'raise' else 'ignore'
+    try:
+        with np.errstate(divide=state, over=state, invalid=state):
+            try:
+                results = function()
+            except (ZeroDivisionError, OverflowError, ValueError):
+                results = None
+            if results is None or any(np.iscomplexobj(result) for result in results):
+                results = fallback()
+    except FloatingPointError as e:
+        raise Exception(f'Evaluation Error: {str(e).capitalize()}')
+
+    # NumPy numbers give nan instead of complex numbers, so a complex value comes from a function that returns
+    # complex numbers for real arguments. Casting it would silently drop its imaginary part.
+    if any(np.iscomplexobj(result) for result in results):
+        raise Exception('Evaluation Error: The expression has complex values')
+
+    values = np.empty((len(results),) + tuple(shape))
+    for i, result in enumerate(results):
+        values[i] = result
+
+    if errors == 'mask':
+        values[np.isinf(values)] = np.nan
+    elif errors == 'clip':
+        limit = np.finfo(float).max
+        np.clip(values, -limit, limit, out=values)
+    return values
+
+
+def with_numpy_numbers(ast):
+    """ Copies an AST object, replacing the values of its number tokens by NumPy floats.
+
+    Arithmetic on NumPy floats follows `np.errstate`, like arithmetic on arrays, so the copy evaluates
+    constant subexpressions the same way as the rest of a vectorized evaluation.
+
+    :rtype: AST
+    """
+    results = []
+    stack = [(ast.main_expression, False)]
+    while len(stack) > 0:
+        node, visited = stack.pop()
+        node_type = type(node)
+        if node_type is NumberExpressionNode:
+            token = node.number_token
+            results.append(NumberExpressionNode(Token(token.kind, np.float64(token.value), token.position)))
+        elif node_type is IdentifierNode:
+            results.append(node)
+        elif not visited:
+            stack.append((node, True))
+            if node_type is BinaryExpressionNode:
+                stack.append((node.right_expression, False))
+                stack.append((node.left_expression, False))
+            elif node_type is UnaryExpressionNode:
+                stack.append((node.operand, False))
+            elif node_type is FunctionCallNode:
+                stack.extend((argument, False) for argument in reversed(node.arguments))
+            else:
+                stack.append((node.main_expression, False))
+        elif node_type is BinaryExpressionNode:
+            right = results.pop()
+            results.append(BinaryExpressionNode(results.pop(), node.operator_token, right))
+        elif node_type is FunctionCallNode:
+            arguments = tuple(results[len(results) - len(node.arguments):])
+            del results[len(results) - len(node.arguments):]
+            results.append(FunctionCallNode(node.name_token, node.open_paren, arguments, node.separators,
+                                            node.close_paren, node.function))
+        elif node_type is UnaryExpressionNode:
+            results.append(UnaryExpressionNode(node.operator_token, results.pop()))
+        else:
+            results.append(ParenthesizedExpressionNode(node.open_paren, results.pop(), node.close_paren))
+
+    return AST(ast.errors, results.pop(), ast.eof_token, ast.identifiers)
+
+
+_pool = None
+_pool_processes = 0
+# The version of the function registry when the pool was created, see `expr_parser.functions.get_version`.
+_pool_version = None
+
+
+class FunctionsUnavailable(Exception):
+    """ Raised when the functions of an expression can not be called from the worker processes. """
+    pass
+
+
+def get_pool():
+    """ Returns the module-wide worker pool, creating it on first use.
+
+    The pool is kept alive between calls so that process startup is paid once, and it is shut down
+    automatically at interpreter exit. It is created again when functions or constants have been registered
+    since it was created, so that forked workers see the same registry as this process.
+
+    :return: The pool and the number of worker processes in it.
+    """
+    import multiprocessing
+    from multiprocessing import resource_tracker
+
+    global _pool, _pool_processes, _pool_version
+    if _pool is not None and _pool_version != get_version():
+        shutdown_pool()
+    if _pool is None:
+        # Start the tracker before forking, so workers share it instead of each spawning their own
+        # and reporting the parent's shared memory blocks as leaked when they exit.
+        resource_tracker.ensure_running()
+        _pool_processes = max(1, multiprocessing.cpu_count() - 1)
+        _pool = multiprocessing.Pool(_pool_processes)
+        _pool_version = get_version()
+        atexit.register(shutdown_pool)
+    return _pool, _pool_processes
+
+
+def shutdown_pool():
+    """ Closes the module-wide worker pool, if it exists, and waits for its workers to exit. """
+    global _pool, _pool_processes
+    if _pool is not None:
+        _pool.close()
+        _pool.join()
+        _pool = None
+        _pool_processes = 0
+        atexit.unregister(shutdown_pool)
+
+
+def _share_functions(steps):
+    """ Replaces the functions called by the steps of `compiler.flatten` by their names in the registry.
+
+    A `Function` can hold lambdas, which can not be pickled, so workers look the functions up by name instead.
+
+    :raises FunctionsUnavailable: If a function is not the one registered under its name.
+    """
+    shared_steps = []
+    for step in steps:
+        if step[0] is FunctionCallNode:
+            if get_function(step[1].name) is not step[1]:
+                raise FunctionsUnavailable()
+            step = (FunctionCallNode, step[1].name, step[2])
+        shared_steps.append(step)
+    return shared_steps
+
+
+def _resolve_functions(steps, version):
+    """ Replaces the names of the functions in steps made by `_share_functions` by the functions they name.
+
+    :param version: The version of the registry of the process that made the steps.
+    :raises FunctionsUnavailable: If the registry of this process differs from it, e.g. because the worker was
+     started with the 'spawn' method and only has the built-in functions.
+    """
+    if get_version() != version:
+        raise FunctionsUnavailable()
+    return [(FunctionCallNode, get_function(step[1]), step[2]) if step[0] is FunctionCallNode else step
+            for step in steps]
+
+
+def _evaluate_chunk(steps, outputs, version, x_name, y_name, length, start, stop, errors):
+    from multiprocessing.shared_memory import SharedMemory
+
+    steps = _resolve_functions(steps, version)
+    x_memory = SharedMemory(name=x_name)
+    try:
+        x_chunk = np.ndarray((length,), dtype=float, buffer=x_memory.buf)[start:stop].copy()
+    finally:
+        x_memory.close()
+
+    variables = {'x': x_chunk}
+    program = compile_steps(steps, outputs)
+
+    def evaluate_with_numpy_numbers():
+        numpy_steps = [(NumberExpressionNode, np.float64(step[1])) if step[0] is NumberExpressionNode else step
+                       for step in steps]
+        return compile_steps(numpy_steps, outputs)(variables)
+
+    y_chunk = evaluate_with_policy(lambda: program(variables), evaluate_with_numpy_numbers, x_chunk.shape, errors)[0]
+
+    y_memory = SharedMemory(name=y_name)
+    try:
+        np.ndarray((length,), dtype=float, buffer=y_memory.buf)[start:stop] = y_chunk
+    finally:
+        y_memory.close()
+
+
+def evaluate_parallel(ast, x_values, chunk_size=None, optimize=True, errors='mask'):
+    """ Evaluates an AST object for an array of x-values across the worker pool.
+
+    The x-values are split into chunks, each of which is evaluated in a vectorized way by one worker.
+    Inputs and results are exchanged through shared memory, so only the expression and the chunk bounds are
+    pickled per task. The expression is sent as the flat list of steps of `compiler.flatten`, which can be
+    pickled whatever the depth of the tree, unlike the tree itself, and the functions it calls are sent by name.
+    If the workers can not call the same functions as this process, e.g. for a function that is no longer
+    registered, the x-values are evaluated in this process instead, see `evaluate_vectorized`.
+
+    :param ast: The AST object to evaluate, a `CompiledExpression` is evaluated through its AST.
+    :param x_values: The points on the x-axis to evaluate the expression at.
+    :param chunk_size: Number of x-values per task, by default the work is split into four chunks per worker.
+    :param optimize: Whether to simplify the tree once, before it is sent to the workers.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :rtype: np.ndarray
+    :return: The y-values corresponding to `x_values`.
+    """
+    from multiprocessing.shared_memory import SharedMemory
+
+    check_error_policy(errors)
+    x_values = np.ascontiguousarray(x_values, dtype=float).ravel()
+    length = len(x_values)
+    if length == 0:
+        return np.empty(0)
+
+    if isinstance(ast, CompiledExpression):
+        ast = ast.ast
+    for name in sorted(ast.identifiers):
+        if name != 'x':
+            raise Exception(f"Evaluation Error: Invalid identifier {name}")
+    if optimize:
+        ast = optimize_ast(ast)
+    steps, outputs = flatten([build_dag(ast).ast.main_expression])
+    try:
+        steps = _share_functions(steps)
+    except FunctionsUnavailable:
+        return evaluate_vectorized(ast, x_values, optimize=False, errors=errors)
+
+    pool, processes = get_pool()
+    if chunk_size is None:
+        chunk_size = -(-length // (processes * 4))
+
+    x_memory = SharedMemory(create=True, size=x_values.nbytes)
+    y_memory = SharedMemory(create=True, size=x_values.nbytes)
+    try:
+        np.ndarray((length,), dtype=float, buffer=x_memory.buf)[:] = x_values
+        tasks = [(steps, outputs, get_version(), x_memory.name, y_memory.name, length, start,
+                  min(start + chunk_size, length), errors) for start in range(0, length, chunk_size)]
+        pool.starmap(_evaluate_chunk, tasks)
+        y_values = np.ndarray((length,), dtype=float, buffer=y_memory.buf).copy()
+    except FunctionsUnavailable:
+        y_values = None
+    finally:
+        x_memory.close()
+        x_memory.unlink()
+        y_memory.close()
+        y_memory.unlink()
+
+    if y_values is None:
+        return evaluate_vectorized(ast, x_values, optimize=False, errors=errors)
+    return y_values
+
+
+def evaluate_in_range(ast, min_x=0, max_x=1, delta=0.0, n_points=50000, parallel=False, optimize=True,
+                      errors='mask'):
     """ Evaluates an AST object in the defined range.
 
-    :param ast: The AST object to evaluate.
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
     :param min_x: Lower bound of the evaluation interval.
     :param max_x: Upper bound of the evaluation interval.
     :param delta: Space between two adjacent point on the x-axis
     :type delta: float
+    :param parallel: Whether to split the evaluation across the worker pool, see `evaluate_parallel`.
+    :param optimize: Whether to simplify the tree before evaluating it, see `expr_parser.optimizer.optimize`.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
     :return Evenly-spaced x-values within the interval [min_x, max_x), and the corresponding y values.
     """
     if min_x > max_x:
@@ -109,12 +530,89 @@ def evaluate_in_range(ast, min_x=0, max_x=1, delta=0.0, n_points=50000):
         delta = (max_x - min_x) / n_points
 
     x_range = np.arange(min_x, max_x, delta)
+    if parallel:
+        y_values = evaluate_parallel(ast, x_range, optimize=optimize, errors=errors)
+    else:
+        y_values = evaluate_vectorized(ast, x_range, optimize=optimize, errors=errors)
+
+    return x_range, y_values
 
-    evaluator = Evaluator(ast)
-    thread_pool = multiprocessing.Pool(multiprocessing.cpu_count() - 1)
-    y_values = thread_pool.map(functools.partial(get_y, evaluator), x_range)
 
-    thread_pool.close()
-    thread_pool.join()
+def iter_range(ast, min_x=0, max_x=1, delta=0.0, n_points=50000, chunk_size=1 << 20, optimize=True, errors='mask'):
+    """ Evaluates an AST object in the defined range, one block of points at a time.
 
-    return x_range, y_values
+    This yields the same points and values as `evaluate_in_range`, without ever holding more than one
+    block of them in memory, so results over very large ranges can be written to disk or reduced
+    (e.g. to their minimum, maximum or integral) as they are produced.
+
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
+    :param min_x: Lower bound of the evaluation interval.
+    :param max_x: Upper bound of the evaluation interval.
+    :param delta: Space between two adjacent point on the x-axis
+    :type delta: float
+    :param chunk_size: The maximum number of points per block.
+    :param optimize: Whether to simplify the tree before evaluating it.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :return: A generator of (x_chunk, y_chunk) pairs of NumPy arrays, in increasing order of x.
+    """
+    if min_x > max_x:
+        min_x, max_x = max_x, min_x
+
+    if min_x == max_x:
+        return
+
+    if delta == 0.0:
+        delta = (max_x - min_x) / n_points
+
+    evaluate = vectorize(ast, optimize, errors)
+
+    # np.arange computes the i-th point as start + i * ((start + delta) - start), which can differ from
+    # start + i * delta in the last bit. Using the same step keeps the blocks identical to evaluate_in_range.
+    length = math.ceil((max_x - min_x) / delta)
+    step = (min_x + delta) - min_x
+    for start in range(0, length, chunk_size):
+        x_chunk = min_x + np.arange(start, min(start + chunk_size, length)) * step
+        yield x_chunk, evaluate(x_chunk)
+
+
+def evaluate_on_grid(ast, ranges, n_points=256, optimize=True, errors='mask'):
+    """ Evaluates an AST object over the grid spanned by a range per identifier.
+
+    Each identifier is bound to its 1-D axis, shaped so that it only extends along its own dimension of
+    the grid, and NumPy broadcasting expands the operations to the full grid. No mesh of coordinates is
+    ever materialized: only the intermediate results that depend on several identifiers are grid-sized.
+
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
+    :param ranges: A dict mapping each identifier to its (min, max) interval, in the order of the grid dimensions.
+     Identifiers the expression doesn't use are allowed and the result is constant along their dimensions.
+    :param n_points: The number of points per axis, or a dict mapping identifiers to their number of points.
+    :param optimize: Whether to simplify the tree before evaluating it.
+    :param errors: The floating-point error policy, 'raise', 'mask' or 'clip', see `evaluate_with_policy`.
+    :return: The list of axes, each holding evenly-spaced values within [min, max) as in `evaluate_in_range`,
+     and the values of the expression as an array of shape (len(axes[0]), len(axes[1]), ...).
+    """
+    check_error_policy(errors)
+    compiled = as_compiled(ast, optimize)
+
+    axes = []
+    for name, (min_value, max_value) in ranges.items():
+        if min_value > max_value:
+            min_value, max_value = max_value, min_value
+        points = n_points[name] if isinstance(n_points, dict) else n_points
+        if min_value == max_value:
+            axes.append(np.empty(0))
+        else:
+            axes.append(np.arange(min_value, max_value, (max_value - min_value) / points))
+
+    shape = tuple(len(axis) for axis in axes)
+    variables = {}
+    for dimension, (name, axis) in enumerate(zip(ranges, axes)):
+        if name in compiled.identifiers:
+            axis_shape = [1] * len(axes)
+            axis_shape[dimension] = len(axis)
+            variables[name] = axis.reshape(axis_shape)
+
+    values = evaluate_with_policy(lambda: [compiled.eval(**variables)],
+                                  lambda: [compile_ast(with_numpy_numbers(compiled.ast), optimize).eval(**variables)],
+                                  shape, errors)[0]
+    return axes, values
@@ -8,21 +8,30 @@ class AST:
 
 
 def print_ast(node, indent="", is_last=True):
-    if node is None:
-        return
+    """ Prints the tree starting from `node`, one node per line, below each other in depth-first order.
 
-    indent_extension = '└── ' if is_last else '├── '
+    The nodes still to be printed are kept on an explicit stack, with the indentation of their line,
+    so the depth of the tree is not limited by Python's recursion limit.
+    """
+    stack = [(node, indent, is_last)]
+    while len(stack) > 0:
+        node, indent, is_last = stack.pop()
+        if node is None:
+            continue
 
-    print(indent, end='')
-    print(indent_extension, end='')
+        indent_extension = '└── ' if is_last else '├── '
 
-    print(type(node).__name__, end='')
-    if type(node).__name__ == 'Token' and node.value is not None:
-        print(' ' + str(node.value), end='')
+        print(indent, end='')
+        print(indent_extension, end='')
 
-    print()
+        print(type(node).__name__, end='')
+        if type(node).__name__ == 'Token' and node.value is not None:
+            print(' ' + str(node.value), end='')
 
-    indent += '    ' if is_last else '│    '
+        print()
 
-    for i, e in enumerate(node.get_children()):
-        print_ast(e, indent, i == len(node.get_children()) - 1)
+        indent += '    ' if is_last else '│    '
+
+        children = node.get_children()
+        for i in reversed(range(len(children))):
+            stack.append((children[i], indent, i == len(children) - 1))
@@ -0,0 +1,114 @@
+import math
+
+from expr_parser.AST import AST
+from expr_parser.nodes import *
+
+
+class ExpressionDAG:
+    def __init__(self, ast=None):
+        """ Hash-conses the tree of an AST object into a directed acyclic graph.
+
+        Structurally identical subtrees are replaced by a single shared node, so an expression like
+        (x^2+1)^3 / (x^2+1) holds one x^2+1 subtree referenced twice. Parenthesized expressions are
+        transparent and are not part of the graph.
+
+        :type ast: AST
+        :param ast: An abstract syntax tree that contains no errors. More trees can be added to the same
+         graph with `add`, and share their subtrees with it.
+        """
+        self.nodes = {}
+        self.parent_counts = {}
+        self.total_nodes = 0
+        self.ast = None
+        if ast is not None:
+            self.ast = self.add(ast)
+
+    def add(self, ast):
+        """ Adds the tree of an AST object to the graph, reusing the nodes the graph already has.
+
+        :type ast: AST
+        :rtype: AST
+        :return: An AST object whose main expression is the root of the tree in the graph.
+        """
+        main_expression = self.__intern(ast.main_expression)
+        return AST(ast.errors, main_expression, ast.eof_token, ast.identifiers)
+
+    @property
+    def unique_nodes(self):
+        """ The number of distinct nodes in the graph. """
+        return len(self.nodes)
+
+    @property
+    def deduplicated_nodes(self):
+        """ The number of tree nodes that were merged into an already existing node. """
+        return self.total_nodes - self.unique_nodes
+
+    def is_shared(self, node):
+        """ Whether the node is referenced by more than one parent in the graph. """
+        return self.parent_counts.get(id(node), 0) > 1
+
+    def __intern(self, node):
+        """ Replaces the subtree starting from `node` by its nodes in the graph, adding the ones it lacks.
+
+        The subtree is walked in post-order with an explicit stack instead of recursion, so its depth is
+        not limited by Python's recursion limit. A node is looked up once its operands are in the graph.
+        """
+        results = []
+        stack = [(node, False)]
+        while len(stack) > 0:
+            node, visited = stack.pop()
+            if isinstance(node, ParenthesizedExpressionNode):
+                stack.append((node.main_expression, False))
+                continue
+
+            if isinstance(node, NumberExpressionNode):
+                value = node.number_token.value
+                key = (NumberExpressionNode, value, math.copysign(1.0, value))
+            elif isinstance(node, IdentifierNode):
+                key = (IdentifierNode, node.identifier_token.value)
+            elif isinstance(node, UnaryExpressionNode):
+                if not visited:
+                    stack.append((node, True))
+                    stack.append((node.operand, False))
+                    continue
+                operand = results.pop()
+                key = (UnaryExpressionNode, node.operator_token.kind, id(operand))
+                node = UnaryExpressionNode(node.operator_token, operand)
+            elif isinstance(node, FunctionCallNode):
+                if not visited:
+                    stack.append((node, True))
+                    stack.extend((argument, False) for argument in reversed(node.arguments))
+                    continue
+                arguments = tuple(results[len(results) - len(node.arguments):])
+                del results[len(results) - len(node.arguments):]
+                key = (FunctionCallNode, node.function) + tuple(id(argument) for argument in arguments)
+                node = FunctionCallNode(node.name_token, node.open_paren, arguments, node.separators,
+                                        node.close_paren, node.function)
+            elif isinstance(node, BinaryExpressionNode):
+                if not visited:
+                    stack.append((node, True))
+                    stack.append((node.right_expression, False))
+                    stack.append((node.left_expression, False))
+                    continue
+                right = results.pop()
+                left = results.pop()
+                key = (BinaryExpressionNode, node.operator_token.kind, id(left), id(right))
+                node = BinaryExpressionNode(left, node.operator_token, right)
+            else:
+                raise Exception(f"DAG Error: Invalid node type \'{type(node).__name__}\'")
+
+            self.total_nodes += 1
+            node = self.nodes.setdefault(key, node)
+            self.parent_counts[id(node)] = self.parent_counts.get(id(node), 0) + 1
+            results.append(node)
+
+        return results.pop()
+
+
+def build_dag(ast=None):
+    """ Builds the `ExpressionDAG` of an AST object, or an empty graph to `add` trees to.
+
+    :type ast: AST
+    :rtype: ExpressionDAG
+    """
+    return ExpressionDAG(ast)
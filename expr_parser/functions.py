@@ -0,0 +1,130 @@
+import math
+
+
+class Function:
+    __slots__ = ('name', 'scalar', 'vector', 'arity')
+
+    def __init__(self, name, scalar, vector=None, arity=1):
+        """ A function that expressions can call, e.g. sin in sin(x).
+
+        :param name: The name used to call the function.
+        :param scalar: The function applied to Python numbers, e.g. math.sin.
+        :param vector: The function applied to NumPy arrays and NumPy numbers, e.g. numpy.sin, or the name of
+         a NumPy function, which is looked up on first use so that NumPy is not imported before it is needed.
+         By default, `scalar` is applied to each element.
+        :param arity: The number of arguments of the function.
+        """
+        self.name = name
+        self.scalar = scalar
+        self.vector = vector
+        self.arity = arity
+
+    def __call__(self, *arguments):
+        """ Applies the scalar function if every argument is a Python number, and the vector function otherwise.
+
+        The ValueError and OverflowError that the function raises, e.g. for log(-1), are raised again with an
+        evaluation error message naming the function. They keep their type, so the vectorized evaluators can
+        still fall back to NumPy numbers, see `evaluator.evaluate_with_policy`.
+        """
+        try:
+            for argument in arguments:
+                if type(argument) is not float and type(argument) is not int:
+                    return self.get_vector()(*arguments)
+            return self.scalar(*arguments)
+        except ValueError as e:
+            raise ValueError(f"Evaluation Error: {str(e).capitalize()} in function \'{self.name}\'")
+        except OverflowError as e:
+            raise OverflowError(f"Evaluation Error: {str(e).capitalize()} in function \'{self.name}\'")
+
+    def __repr__(self):
+        return f'Function({self.name}, {self.arity})'
+
+    def get_vector(self):
+        if isinstance(self.vector, str):
+            import numpy as np
+            self.vector = getattr(np, self.vector)
+        elif self.vector is None:
+            import numpy as np
+            self.vector = np.vectorize(self.scalar, otypes=[float])
+        return self.vector
+
+
+FUNCTIONS = {}
+
+CONSTANTS = {}
+
+# Incremented by every registration, see `get_version`.
+_version = 0
+
+
+def register_function(name, scalar, vector=None, arity=1):
+    """ Makes a function callable from expressions parsed from now on, see `Function`.
+
+    Registering a name again replaces the previous function for the expressions parsed afterwards.
+
+    :param name: The name used to call the function, it must be a valid identifier.
+    :param scalar: The function applied to Python numbers.
+    :param vector: The function applied to NumPy arrays, or the name of a NumPy function.
+    :param arity: The number of arguments of the function, at least 1.
+    :rtype: Function
+    """
+    global _version
+    check_name(name)
+    if arity < 1:
+        raise ValueError(f'Function Error: The function \'{name}\' must take at least one argument.')
+
+    function = Function(name, scalar, vector, arity)
+    FUNCTIONS[name] = function
+    _version += 1
+    return function
+
+
+def register_constant(name, value):
+    """ Makes a named constant usable in expressions parsed from now on, e.g. pi.
+
+    The parser replaces the name by its value, so a constant costs nothing to evaluate and is folded by the
+    optimizer. The name is reserved: in expressions parsed from now on, it always means the constant and can
+    no longer be used as an identifier, e.g. x*e is x times Euler's number, and setting a variable called e
+    raises a KeyError that says e is a constant.
+
+    :param name: The name of the constant, it must be a valid identifier.
+    :param value: The value of the constant.
+    """
+    global _version
+    check_name(name)
+    CONSTANTS[name] = float(value)
+    _version += 1
+
+
+def get_function(name):
+    """ The registered function called `name`, or None. """
+    return FUNCTIONS.get(name)
+
+
+def get_constant(name):
+    """ The value of the registered constant called `name`, or None. """
+    return CONSTANTS.get(name)
+
+
+def get_version():
+    """ A number that changes every time a function or a constant is registered.
+
+    Anything derived from the registry, like parsed expressions or the processes that evaluate them, is stale
+    once the version differs from the one it was built with.
+    """
+    return _version
+
+
+def check_name(name):
+    if not isinstance(name, str) or name == '' or not all(c.isalpha() or c == '_' for c in name):
+        raise ValueError(f'Function Error: \'{name}\' is not a valid identifier.')
+
+
+register_function('sin', math.sin, 'sin')
+register_function('cos', math.cos, 'cos')
+register_function('exp', math.exp, 'exp')
+register_function('log', math.log, 'log')
+register_function('sqrt', math.sqrt, 'sqrt')
+register_function('abs', math.fabs, 'abs')
+register_constant('pi', math.pi)
+register_constant('e', math.e)
@@ -1,5 +1,35 @@
+import re
+
 from expr_parser.tokens import Token, TokenKind
 
+# Matches the next token, after skipping whitespace. Numbers, ASCII identifiers and operators are scanned by
+# the regular expression. Anything else, including identifiers that contain non-ASCII letters, is matched as
+# a single character that `Lexer.tokenize` looks at on its own.
+TOKEN_PATTERN = re.compile(r'''
+    [ \t\n\r]*
+    (?:
+        (?P<NUMBER>[0-9]+(?:\.[0-9]*)?)
+      | (?P<IDENTIFIER>[A-Za-z_]+)(?![A-Za-z_]|[^\x00-\x7f])
+      | (?P<OPERATOR>[-+*/^(),])
+      | (?P<OTHER>[^ \t\n\r])
+    )
+''', re.VERBOSE | re.DOTALL)
+
+NUMBER_GROUP = TOKEN_PATTERN.groupindex['NUMBER']
+IDENTIFIER_GROUP = TOKEN_PATTERN.groupindex['IDENTIFIER']
+OPERATOR_GROUP = TOKEN_PATTERN.groupindex['OPERATOR']
+
+OPERATOR_KINDS = {
+    '(': TokenKind.LEFT_PAREN,
+    ')': TokenKind.RIGHT_PAREN,
+    '*': TokenKind.STAR,
+    '/': TokenKind.SLASH,
+    '+': TokenKind.PLUS,
+    '-': TokenKind.MINUS,
+    '^': TokenKind.CARET,
+    ',': TokenKind.COMMA,
+}
+
 
 class Lexer:
     def __init__(self, line: str):
@@ -7,84 +37,89 @@ class Lexer:
 
         :param line: String to generate a list of tokens from.
         """
-        self.current = None
-        self.position = -1
+        self.text = line
+        self.position = 0
         self.tokens = []
         self.errors = []
-        self.text_repr = iter(line)
-        self.__next_char()
 
     def tokenize(self):
         """ Generates a list of token for the string provided at construction-time.
 
+        The text is scanned with a single regular expression that matches one token per step, so tokens are
+        sliced out of the text instead of being built one character at a time.
+
         :rtype: list[Token]
         :return: a list of tokens, the types of those tokens are defined in expr_parser.tokens
         """
-        while self.current is not None:
-            if is_whitespace(self.current):
-                self.__next_char()
-                continue
-            elif self.current.isdigit():
-                self.tokens.append(self.__lex_number())
-                continue
-            elif is_part_of_identifier_token(self.current):
-                self.tokens.append(self.__lex_identifier())
-                continue
-            elif self.current == '(':
-                self.tokens.append(Token(TokenKind.LEFT_PAREN, self.current, self.position))
-            elif self.current == ')':
-                self.tokens.append(Token(TokenKind.RIGHT_PAREN, self.current, self.position))
-            elif self.current == '*':
-                self.tokens.append(Token(TokenKind.STAR, self.current, self.position))
-            elif self.current == '/':
-                self.tokens.append(Token(TokenKind.SLASH, self.current, self.position))
-            elif self.current == '+':
-                self.tokens.append(Token(TokenKind.PLUS, self.current, self.position))
-            elif self.current == '-':
-                self.tokens.append(Token(TokenKind.MINUS, self.current, self.position))
-            elif self.current == '^':
-                self.tokens.append(Token(TokenKind.CARET, self.current, self.position))
-            else:
-                self.errors.append(f'Lexer Error: Unexpected character \'{self.current}\' at column {self.position}')
-                self.tokens.append(Token(TokenKind.BAD, self.current, self.position))
-
-            self.__next_char()
-
-        self.tokens.append(Token(TokenKind.END_OF_FILE, None, self.position + 1))
-        return self.tokens
-
-    def __next_char(self):
-        try:
-            self.current = next(self.text_repr)
-            self.position += 1
-        except StopIteration:
-            self.current = None
-
-    def __lex_number(self):
-        str_number = ''
-        position = self.position
-        one_decimal_point: bool = False
-        while (self.current is not None) and is_part_of_number_token(self.current):
-
-            if self.current == '.' and one_decimal_point:
+        text = self.text
+        tokens = self.tokens
+        if text.isascii():
+            self.__tokenize_ascii()
+            return tokens
+
+        match_token = TOKEN_PATTERN.match
+        while True:
+            match = match_token(text, self.position)
+            if match is None:
                 break
 
-            if self.current == '.':
-                one_decimal_point = True
-
-            str_number += self.current
-            self.__next_char()
-
-        return Token(TokenKind.NUMBER, float(str_number), position)
-
-    def __lex_identifier(self):
-        name = ''
-        position = self.position
-        while self.current is not None and is_part_of_identifier_token(self.current):
-            name += self.current
-            self.__next_char()
-
-        return Token(TokenKind.IDENTIFIER, name, position)
+            kind = match.lastgroup
+            value = match.group(kind)
+            position = match.start(kind)
+            self.position = match.end()
+            if kind == 'OPERATOR':
+                tokens.append(Token(OPERATOR_KINDS[value], value, position))
+            elif kind == 'NUMBER':
+                tokens.append(Token(TokenKind.NUMBER, float(value), position))
+            elif kind == 'IDENTIFIER':
+                tokens.append(Token(TokenKind.IDENTIFIER, value, position))
+            elif value.isdigit():
+                tokens.append(self.__lex_number(position))
+            elif is_part_of_identifier_token(value):
+                tokens.append(self.__lex_identifier(position))
+            else:
+                self.errors.append(f'Lexer Error: Unexpected character \'{value}\' at column {position}')
+                tokens.append(Token(TokenKind.BAD, value, position))
+
+        tokens.append(Token(TokenKind.END_OF_FILE, None, len(text)))
+        return tokens
+
+    def __tokenize_ascii(self):
+        # In ASCII text, every letter and digit is matched by the regular expression, so a character matched as
+        # OTHER is always unexpected and the matches never need to be resumed from another position.
+        append = self.tokens.append
+        for match in TOKEN_PATTERN.finditer(self.text):
+            group = match.lastindex
+            value = match[group]
+            if group == OPERATOR_GROUP:
+                append(Token(OPERATOR_KINDS[value], value, match.start(group)))
+            elif group == NUMBER_GROUP:
+                append(Token(TokenKind.NUMBER, float(value), match.start(group)))
+            elif group == IDENTIFIER_GROUP:
+                append(Token(TokenKind.IDENTIFIER, value, match.start(group)))
+            else:
+                position = match.start(group)
+                self.errors.append(f'Lexer Error: Unexpected character \'{value}\' at column {position}')
+                append(Token(TokenKind.BAD, value, position))
+
+        self.position = len(self.text)
+        append(Token(TokenKind.END_OF_FILE, None, len(self.text)))
+
+    def __lex_number(self, position):
+        # Any digit starts a number, but only 0-9 are part of it. A number starting with another digit is empty,
+        # and fails to convert to a float.
+        end = position
+        while end < len(self.text) and self.text[end] in '0123456789':
+            end += 1
+        self.position = end
+        return Token(TokenKind.NUMBER, float(self.text[position:end]), position)
+
+    def __lex_identifier(self, position):
+        end = position
+        while end < len(self.text) and is_part_of_identifier_token(self.text[end]):
+            end += 1
+        self.position = end
+        return Token(TokenKind.IDENTIFIER, self.text[position:end], position)
 
 
 def is_part_of_number_token(c):
@@ -1,51 +1,80 @@
 class NumberExpressionNode:
+    __slots__ = ('number_token',)
+
     def __init__(self, number_token):
         self.number_token = number_token
 
     def get_children(self):
-        return [self.number_token]
+        return (self.number_token,)
 
 
 class IdentifierNode:
+    __slots__ = ('identifier_token',)
+
     def __init__(self, identifier_token):
         self.identifier_token = identifier_token
 
     def get_children(self):
-        return [self.identifier_token]
+        return (self.identifier_token,)
 
 
 class UnaryExpressionNode:
+    __slots__ = ('operator_token', 'operand')
+
     def __init__(self, operator_token, operand):
         self.operator_token = operator_token
         self.operand = operand
 
     def get_children(self):
-        return [self.operator_token, self.operand]
+        return self.operator_token, self.operand
 
 
 class BinaryExpressionNode:
+    __slots__ = ('left_expression', 'operator_token', 'right_expression')
+
     def __init__(self, left_expression, operator_token, right_expression):
         self.left_expression = left_expression
         self.operator_token = operator_token
         self.right_expression = right_expression
 
     def get_children(self):
-        return [
-            self.left_expression,
-            self.operator_token,
-            self.right_expression
-        ]
+        return self.left_expression, self.operator_token, self.right_expression
 
 
 class ParenthesizedExpressionNode:
+    __slots__ = ('open_paren', 'main_expression', 'close_paren')
+
     def __init__(self, open_paren, main_expression, close_paren):
         self.open_paren = open_paren
         self.main_expression = main_expression
         self.close_paren = close_paren
 
     def get_children(self):
-        return [
-            self.open_paren,
-            self.main_expression,
-            self.close_paren
-        ]
+        return self.open_paren, self.main_expression, self.close_paren
+
+
+class FunctionCallNode:
+    __slots__ = ('name_token', 'open_paren', 'arguments', 'separators', 'close_paren', 'function')
+
+    def __init__(self, name_token, open_paren, arguments, separators, close_paren, function):
+        """ A call of a registered function, e.g. sin(x) or f(x, y).
+
+        :param arguments: The tuple of the expression nodes of the arguments.
+        :param separators: The tuple of the comma tokens between the arguments.
+        :param function: The `expr_parser.functions.Function` that is called, None if the name is unknown.
+        """
+        self.name_token = name_token
+        self.open_paren = open_paren
+        self.arguments = arguments
+        self.separators = separators
+        self.close_paren = close_paren
+        self.function = function
+
+    def get_children(self):
+        children = [self.name_token, self.open_paren]
+        for i, argument in enumerate(self.arguments):
+            if i > 0:
+                children.append(self.separators[i - 1])
+            children.append(argument)
+        children.append(self.close_paren)
+        return tuple(children)
@@ -0,0 +1,152 @@
+from expr_parser.AST import AST
+from expr_parser.nodes import *
+from expr_parser.tokens import Token, TokenKind
+
+
+def optimize(ast):
+    """ Simplifies an AST object before evaluation.
+
+    Constant subtrees, including calls of functions with constant arguments, are folded into number nodes,
+    parenthesized expressions are unwrapped and the
+    identities x * 1, 1 * x, x / 1, x + 0, 0 + x, x - 0, x ^ 1, +x and --x are reduced to x.
+    Subtrees whose evaluation would raise (e.g. 1 / 0) or not produce a real number are left as they are,
+    so the evaluator behaves the same way on the optimized tree. Calls are folded through `Function.__call__`,
+    like the evaluator makes them, so the NumPy numbers of `evaluator.with_numpy_numbers` stay NumPy numbers
+    and their operations follow `np.errstate`.
+
+    :type ast: AST
+    :param ast: An abstract syntax tree that contains no errors.
+    :rtype: AST
+    :return: A new AST object, the input tree is not modified.
+    """
+    return AST(ast.errors, optimize_node(ast.main_expression), ast.eof_token, ast.identifiers)
+
+
+def optimize_node(node):
+    """ Simplifies the subtree starting from the node `node`.
+
+    The subtree is walked in post-order with an explicit stack instead of recursion, so its depth is not
+    limited by Python's recursion limit. A node is pushed a second time, with `visited` set, to be rebuilt
+    from its simplified operands.
+
+    :param node: The root of the subtree to simplify.
+    :return: The root of the simplified subtree.
+    """
+    results = []
+    stack = [(node, False)]
+    while len(stack) > 0:
+        node, visited = stack.pop()
+        if isinstance(node, ParenthesizedExpressionNode):
+            stack.append((node.main_expression, False))
+        elif isinstance(node, UnaryExpressionNode):
+            if visited:
+                results.append(optimize_unary_expression(node.operator_token, results.pop()))
+            else:
+                stack.append((node, True))
+                stack.append((node.operand, False))
+        elif isinstance(node, FunctionCallNode):
+            if visited:
+                arguments = tuple(results[len(results) - len(node.arguments):])
+                del results[len(results) - len(node.arguments):]
+                results.append(optimize_function_call(node, arguments))
+            else:
+                stack.append((node, True))
+                stack.extend((argument, False) for argument in reversed(node.arguments))
+        elif isinstance(node, BinaryExpressionNode):
+            if visited:
+                right = results.pop()
+                left = results.pop()
+                results.append(optimize_binary_expression(left, node.operator_token, right))
+            else:
+                stack.append((node, True))
+                stack.append((node.right_expression, False))
+                stack.append((node.left_expression, False))
+        else:
+            results.append(node)
+
+    return results.pop()
+
+
+def optimize_unary_expression(operator_token, operand):
+    if operator_token.kind == TokenKind.PLUS:
+        return operand
+
+    if operator_token.kind == TokenKind.MINUS:
+        if isinstance(operand, NumberExpressionNode):
+            return make_number(-operand.number_token.value, operator_token.position)
+        if isinstance(operand, UnaryExpressionNode) and operand.operator_token.kind == TokenKind.MINUS:
+            return operand.operand
+
+    return UnaryExpressionNode(operator_token, operand)
+
+
+def optimize_binary_expression(left, operator_token, right):
+    kind = operator_token.kind
+    left_value = get_constant_value(left)
+    right_value = get_constant_value(right)
+
+    if left_value is not None and right_value is not None:
+        value = fold_binary_operation(left_value, kind, right_value)
+        if value is not None:
+            return make_number(value, get_position(left))
+
+    if right_value == 1 and kind in (TokenKind.STAR, TokenKind.SLASH, TokenKind.CARET):
+        return left
+    if right_value == 0 and kind in (TokenKind.PLUS, TokenKind.MINUS):
+        return left
+    if left_value == 1 and kind == TokenKind.STAR:
+        return right
+    if left_value == 0 and kind == TokenKind.PLUS:
+        return right
+
+    return BinaryExpressionNode(left, operator_token, right)
+
+
+def optimize_function_call(node, arguments):
+    values = [get_constant_value(argument) for argument in arguments]
+    if all(value is not None for value in values):
+        try:
+            value = node.function(*values)
+        except (ValueError, ZeroDivisionError, OverflowError, FloatingPointError):
+            value = None
+        if isinstance(value, float):
+            return make_number(value, node.name_token.position)
+
+    return FunctionCallNode(node.name_token, node.open_paren, arguments, node.separators, node.close_paren,
+                            node.function)
+
+
+def fold_binary_operation(left, kind, right):
+    try:
+        if kind == TokenKind.PLUS:
+            value = left + right
+        elif kind == TokenKind.MINUS:
+            value = left - right
+        elif kind == TokenKind.STAR:
+            value = left * right
+        elif kind == TokenKind.SLASH:
+            value = left / right
+        elif kind == TokenKind.CARET:
+            value = left ** right
+        else:
+            return None
+    except (ZeroDivisionError, OverflowError, FloatingPointError):
+        return None
+
+    return value if isinstance(value, float) else None
+
+
+def get_constant_value(node):
+    if isinstance(node, NumberExpressionNode):
+        return node.number_token.value
+    return None
+
+
+def get_position(node):
+    while not isinstance(node, Token):
+        node = node.get_children()[0]
+    return node.position
+
+
+def make_number(value, position):
+    return NumberExpressionNode(Token(TokenKind.NUMBER, value, position))
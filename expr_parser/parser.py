@@ -1,3 +1,4 @@
+from expr_parser.functions import get_constant, get_function
 from expr_parser.lexer import Lexer
 from expr_parser.tokens import Token, TokenKind
 from expr_parser.AST import AST
@@ -40,42 +41,23 @@ class Parser:
         except KeyError:
             return 0
 
-    def parse_parenthesized_expression(self):
-        """ Parse an expression enclosed in parentheses in the following form:
-            ( EXPRESSION )
-
-        :rtype: ParenthesizedExpressionNode
-        :return: A parenthesized expression AST node.
-        """
-        open_paren = self.match_if(TokenKind.LEFT_PAREN)
-        main_expression = self.parse_expression()
-        close_paren = self.match_if(TokenKind.RIGHT_PAREN)
-
-        return ParenthesizedExpressionNode(open_paren, main_expression, close_paren)
-
     def parse_primary_expression(self):
-        """ Parse an expression of highest priority. This could be either a parenthesized expression,
-         an identifier, a unary expression, or a number expression.
+        """ Parse an expression of highest priority that does not contain other expressions, either an
+        identifier or a number expression. Parenthesized expressions, function calls and unary expressions are
+        primary expressions too, they are parsed by `parse_expression` since they contain full expressions.
+
+        The name of a registered constant, e.g. pi, is parsed as a number expression holding its value.
 
         :return: A primary expression AST node.
         """
-        if self.does_match(TokenKind.LEFT_PAREN):
-            return self.parse_parenthesized_expression()
-
         if self.does_match(TokenKind.IDENTIFIER):
             identifier_token = self.match_if(TokenKind.IDENTIFIER)
+            value = get_constant(identifier_token.value)
+            if value is not None:
+                return NumberExpressionNode(Token(TokenKind.NUMBER, value, identifier_token.position))
             self.identifiers.add(identifier_token.value)
             return IdentifierNode(identifier_token)
 
-        if self.does_match(TokenKind.PLUS):
-            plus_token = self.match_if(TokenKind.PLUS)
-            operand = self.parse_expression()
-            return UnaryExpressionNode(plus_token, operand)
-        elif self.does_match(TokenKind.MINUS):
-            minus_token = self.match_if(TokenKind.MINUS)
-            operand = self.parse_expression()
-            return UnaryExpressionNode(minus_token, operand)
-
         number_token = self.match_if(TokenKind.NUMBER, expect_expression=True)
         return NumberExpressionNode(number_token)
 
@@ -93,33 +75,95 @@ class Parser:
         return AST(self.errors, expression, eof_token, self.identifiers)
 
     def parse_expression(self, parent_precedence=0):
-        """ Calls itself recursively based on operator precedences to parse a full expression.
+        """ Parses a full expression based on operator precedences.
         Unary expressions are of highest priority, they're consumed at the start of expression parsing,
         if any unary operators exist.
 
+        The grammar is recursive, but the parser keeps its own stack of pending operators and parentheses
+        instead of calling itself, so the depth of the input is not limited by Python's recursion limit.
+        Every entry of the stack records what to build once the subexpression being parsed is complete,
+        and the precedence of the expression it belongs to.
+
         :rtype ExpressionNode
         :return Returns a node of type NumberExpressionNode, IdentifierNode, ParenthesizedExpressionNode,
-         BinaryExpressionNode or a UnaryExpressionNode
+         FunctionCallNode, BinaryExpressionNode or a UnaryExpressionNode
         """
-        current = self.get_current()
-        unary_operator_precedence = self.get_unary_operator_precedence(current.kind)
-        if unary_operator_precedence != 0 and unary_operator_precedence >= parent_precedence:
-            unary_operator = self.next_token()
-            operand = self.parse_expression(unary_operator_precedence)
-            left = UnaryExpressionNode(unary_operator, operand)
-        else:
-            left = self.parse_primary_expression()
-
+        stack = []
+        precedence = parent_precedence
         while True:
-            precedence = self.get_binary_operator_precedence(self.get_current().kind)
-            if precedence == 0 or precedence <= parent_precedence:
-                break
+            # Parse the operand at the start of an expression: a unary operator followed by an operand
+            # of higher precedence, or a primary expression.
+            current = self.get_current()
+            unary_operator_precedence = self.get_unary_operator_precedence(current.kind)
+            if unary_operator_precedence != 0 and unary_operator_precedence >= precedence:
+                stack.append((UnaryExpressionNode, self.next_token(), precedence))
+                precedence = unary_operator_precedence
+                continue
+
+            # A function call: IDENTIFIER ( EXPRESSION [, EXPRESSION]... )
+            if current.kind == TokenKind.IDENTIFIER and self.peek(1).kind == TokenKind.LEFT_PAREN:
+                stack.append((FunctionCallNode, (self.next_token(), self.next_token(), [], []), precedence))
+                precedence = 0
+                continue
+            # A parenthesized expression: ( EXPRESSION )
+            if current.kind == TokenKind.LEFT_PAREN:
+                stack.append((ParenthesizedExpressionNode, self.next_token(), precedence))
+                precedence = 0
+                continue
+            # A unary operator that did not bind above, applied to a full expression.
+            if current.kind == TokenKind.PLUS or current.kind == TokenKind.MINUS:
+                stack.append((UnaryExpressionNode, self.next_token(), precedence))
+                precedence = 0
+                continue
 
-            operator_token = self.next_token()
-            right = self.parse_expression(precedence)
-            left = BinaryExpressionNode(left, operator_token, right)
+            left = self.parse_primary_expression()
 
-        return left
+            # Extend the expression with binary operators of higher precedence than its own, and complete
+            # the pending entries of the stack whose subexpression ends here.
+            while True:
+                binary_operator_precedence = self.get_binary_operator_precedence(self.get_current().kind)
+                if binary_operator_precedence != 0 and binary_operator_precedence > precedence:
+                    stack.append((BinaryExpressionNode, (left, self.next_token()), precedence))
+                    precedence = binary_operator_precedence
+                    break
+
+                if len(stack) == 0:
+                    return left
+
+                node_type, pending, precedence = stack.pop()
+                if node_type is BinaryExpressionNode:
+                    left = BinaryExpressionNode(pending[0], pending[1], left)
+                elif node_type is UnaryExpressionNode:
+                    left = UnaryExpressionNode(pending, left)
+                elif node_type is FunctionCallNode:
+                    name_token, open_paren, arguments, separators = pending
+                    arguments.append(left)
+                    if self.does_match(TokenKind.COMMA):
+                        # Parse the next argument, the call is completed after its last argument.
+                        separators.append(self.next_token())
+                        stack.append((node_type, pending, precedence))
+                        precedence = 0
+                        break
+                    close_paren = self.match_if(TokenKind.RIGHT_PAREN)
+                    left = self.make_function_call(name_token, open_paren, arguments, separators, close_paren)
+                else:
+                    close_paren = self.match_if(TokenKind.RIGHT_PAREN)
+                    left = ParenthesizedExpressionNode(pending, left, close_paren)
+
+    def make_function_call(self, name_token, open_paren, arguments, separators, close_paren):
+        """ Builds the node of a call, reporting calls of unknown functions and calls with a wrong number of
+        arguments, see `expr_parser.functions.register_function`.
+
+        :rtype: FunctionCallNode
+        """
+        function = get_function(name_token.value)
+        if function is None:
+            self.errors.append(
+                f'Parser Error: Unknown function \'{name_token.value}\' at column {name_token.position}.')
+        elif function.arity != len(arguments):
+            self.errors.append(f'Parser Error: Function \'{function.name}\' takes {function.arity} '
+                               f'argument{"s" if function.arity != 1 else ""}, got {len(arguments)}.')
+        return FunctionCallNode(name_token, open_paren, tuple(arguments), tuple(separators), close_paren, function)
 
     def does_match(self, token_kind):
         return self.get_current().kind == token_kind
@@ -13,11 +13,11 @@ class TokenKind(enum.Enum):
     LEFT_PAREN = 7
     RIGHT_PAREN = 8
     END_OF_FILE = 9
+    COMMA = 10
 
 
 class Token:
-    kind: TokenKind
-    value: any = None
+    __slots__ = ('kind', 'value', 'position')
 
     def __init__(self, token_kind, value, position):
         self.kind = token_kind
@@ -31,4 +31,4 @@ class Token:
         return self.kind == other.kind and self.value == other.value and self.position == other.position
 
     def get_children(self):
-        return []
+        return ()
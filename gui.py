@@ -1,22 +1,51 @@
-import matplotlib.pyplot as plt
-from PyQt5.QtCore import pyqtSlot, Qt, QRegExp
+import functools
+import time
+
+import numpy as np
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, Qt, QRegExp, QThread
 from PyQt5.QtGui import QColor, QRegExpValidator
-from PyQt5.QtWidgets import QWidget, QLineEdit, QPushButton, QLabel
+from PyQt5.QtWidgets import QWidget, QLineEdit, QPushButton, QLabel, QProgressBar
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
+
+from cache import expression_cache, normalize_expression, sample_cache
+from evaluator import vectorize_many
+from sampling import decimate_min_max
+
+LOD_SAMPLES_PER_PIXEL = 8
+
+EVALUATION_CHUNK_SIZE = 1 << 16
+
+PREVIEW_SAMPLES = 512
+
+REFINEMENT_FACTOR = 4
 
-from evaluator import evaluate_in_range
-from expr_parser.parser import Parser
+AUTOSCALE_TOLERANCE = 0.01
 
 
 class Canvas(FigureCanvas):
+    frame_drawn = pyqtSignal(str, float)
+
     def __init__(self, parent, x_values, y_values):
-        fig, self.ax = plt.subplots(dpi=120)
+        fig = Figure(dpi=120)
+        self.ax = fig.add_subplot()
         super().__init__(fig)
         self.setParent(parent)
         self.x_values = x_values
         self.y_values = y_values
+        self.labels = []
+        self.function = None
+        self.function_key = None
+        self.lines = []
+        self.legend_labels = None
+        self.autoscaled_bounds = None
+        self.background = None
+        self.draw_requested = False
         self.setGeometry(180, 50, 640, 500)
+        self.ax.grid()
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+        self.mpl_connect('draw_event', self.on_draw)
         self.show_plot()
         self.set_plot_border_black()
 
@@ -27,10 +56,274 @@ class Canvas(FigureCanvas):
         self.ax.spines['left'].set_color('0.0')
 
     def show_plot(self):
-        self.ax.cla()
-        self.ax.plot(self.x_values, self.y_values)
-        self.ax.grid()
-        self.figure.canvas.draw_idle()
+        """ Draws the stored curves, sharing the stored x-values.
+
+        The lines of the previous plot are kept and only their data is replaced. Lines are added or removed
+        only when the number of curves changes, so re-plotting does not rebuild the axes. If neither the
+        lines, the legend nor the limits of the axes changed, e.g. between two passes of a progressive
+        evaluation, only the lines are redrawn over a cached background, see `blit_lines`.
+        """
+        curves = self.get_curves()
+        layout_changed = False
+        while len(self.lines) > len(curves):
+            self.lines.pop().remove()
+            layout_changed = True
+        while len(self.lines) < len(curves):
+            line, = self.ax.plot([], [], color=f'C{len(self.lines)}')
+            self.lines.append(line)
+            layout_changed = True
+
+        pixel_width = self.get_pixel_width()
+        for line, y_values in zip(self.lines, curves):
+            line.set_data(*decimate_min_max(self.x_values, y_values, pixel_width))
+
+        layout_changed = self.update_legend() or layout_changed
+        if self.autoscale_if_needed() or layout_changed:
+            self.request_draw()
+        else:
+            self.blit_lines()
+
+    def get_curves(self):
+        """ The stored y-values, as an array with one row per curve. """
+        return np.atleast_2d(np.asarray(self.y_values, dtype=float))
+
+    def update_legend(self):
+        """ Labels the lines and shows the legend if there is more than one curve.
+
+        :return: Whether the legend changed.
+        """
+        labels = [self.labels[i] if i < len(self.labels) else f'_curve{i}' for i in range(len(self.lines))]
+        if labels == self.legend_labels:
+            return False
+
+        self.legend_labels = labels
+        for line, label in zip(self.lines, labels):
+            line.set_label(label)
+
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if len(self.lines) > 1:
+            self.ax.legend(loc='upper right')
+        return True
+
+    def autoscale_if_needed(self):
+        """ Fits the axes to the stored curves, unless their bounds barely moved since the last time.
+
+        Refining a curve or plotting another expression with a similar range keeps the current view, and
+        with it any zoom or pan, instead of rescaling for differences that are not visible.
+
+        :return: Whether the limits of the axes were changed.
+        """
+        bounds = get_bounds(self.x_values, self.get_curves())
+        if bounds is None:
+            return False
+
+        previous = self.autoscaled_bounds
+        if previous is not None:
+            x_tolerance = AUTOSCALE_TOLERANCE * (previous[1] - previous[0])
+            y_tolerance = AUTOSCALE_TOLERANCE * (previous[3] - previous[2])
+            tolerances = (x_tolerance, x_tolerance, y_tolerance, y_tolerance)
+            if all(abs(new - old) <= tolerance for new, old, tolerance in zip(bounds, previous, tolerances)):
+                return False
+
+        self.autoscaled_bounds = bounds
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return True
+
+    def blit_lines(self):
+        """ Redraws only the lines, over a cached image of the rest of the figure.
+
+        The background is captured with the lines hidden on the first update after a full draw, and
+        reused until the next full draw, which happens whenever the limits, the size or the legend change.
+        If a full draw is already scheduled, it will draw the lines anyway and nothing is done.
+        """
+        if self.draw_requested:
+            return
+
+        start = time.perf_counter()
+        if self.background is None:
+            for line in self.lines:
+                line.set_visible(False)
+            self.draw()
+            self.background = self.copy_from_bbox(self.figure.bbox)
+            for line in self.lines:
+                line.set_visible(True)
+        else:
+            self.restore_region(self.background)
+
+        for line in self.lines:
+            self.ax.draw_artist(line)
+        legend = self.ax.get_legend()
+        if legend is not None:
+            self.ax.draw_artist(legend)
+        self.blit(self.figure.bbox)
+        self.frame_drawn.emit('blit', time.perf_counter() - start)
+
+    def draw(self):
+        """ Renders the whole figure, and reports how long it took through the `frame_drawn` signal. """
+        start = time.perf_counter()
+        super().draw()
+        self.frame_drawn.emit('draw', time.perf_counter() - start)
+
+    def request_draw(self):
+        """ Schedules a full draw of the figure, see `draw_idle`. """
+        self.draw_requested = True
+        self.draw_idle()
+
+    def on_draw(self, event):
+        self.background = None
+        self.draw_requested = False
+
+    def get_pixel_width(self):
+        return max(1, int(self.ax.bbox.width))
+
+    def on_xlim_changed(self, ax):
+        """ Redraws the curves at the level of detail of the new viewport.
+
+        If the canvas knows the function behind the curves, the part of the viewport within the plotted range
+        is re-sampled at a fixed number of samples per pixel, so zooming in reveals detail that the original
+        samples did not have.
+        Otherwise the stored samples are cut to the viewport. Either way each curve is decimated to about
+        two points per pixel, so the draw cost does not depend on how much data there is.
+        """
+        x_min, x_max = ax.get_xlim()
+        pixel_width = self.get_pixel_width()
+
+        if self.function is not None and len(self.x_values) > 0:
+            x_min = max(x_min, self.x_values[0])
+            x_max = min(x_max, self.x_values[-1])
+            if x_min >= x_max:
+                # The viewport does not overlap the plotted range, so there is nothing to draw.
+                for line in self.lines:
+                    line.set_data([], [])
+                self.request_draw()
+                return
+            x_values, y_values = sample_cache.sample(self.function_key, self.function, x_min, x_max,
+                                                     pixel_width * LOD_SAMPLES_PER_PIXEL)
+        else:
+            x_values = np.asarray(self.x_values, dtype=float)
+            start = max(0, np.searchsorted(x_values, x_min) - 1)
+            stop = np.searchsorted(x_values, x_max, side='right') + 1
+            x_values, y_values = x_values[start:stop], self.get_curves()[:, start:stop]
+
+        curves = np.reshape(np.asarray(y_values, dtype=float), (len(self.lines), -1))
+        for line, y_values in zip(self.lines, curves):
+            line.set_data(*decimate_min_max(x_values, y_values, pixel_width))
+        self.request_draw()
+
+
+def get_bounds(x_values, curves):
+    """ The extent of the finite samples of the curves, as (x_min, x_max, y_min, y_max), or None if there are none. """
+    x_values = np.asarray(x_values, dtype=float)
+    finite = np.isfinite(curves) & np.isfinite(x_values)
+    if not finite.any():
+        return None
+
+    x_finite = np.broadcast_to(x_values, curves.shape)[finite]
+    y_finite = curves[finite]
+    return x_finite.min(), x_finite.max(), y_finite.min(), y_finite.max()
+
+
+def merge_samples(pieces):
+    """ Joins pieces of curves sampled over disjoint parts of a range into one, in increasing order of x.
+
+    :param pieces: A list of (x_values, y_values) pairs, the y-values having one row per curve.
+    :return: The x-values and the y-values of all pieces.
+    """
+    pieces = sorted((piece for piece in pieces if len(piece[0]) > 0), key=lambda piece: piece[0][0])
+    return (np.concatenate([x_values for x_values, _ in pieces]),
+            np.concatenate([y_values for _, y_values in pieces], axis=-1))
+
+
+class EvaluationCancelled(Exception):
+    pass
+
+
+class EvaluationWorker(QThread):
+    progress = pyqtSignal(int, int)
+    partial_result = pyqtSignal(int, object, object)
+    result_ready = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, generation, key, function, x_min, x_max):
+        """ Samples a function over a range on a background thread.
+
+        The range is sampled through the sample cache, in chunks, so that the worker can report its
+        progress and notice that it has been cancelled with `requestInterruption` between two chunks.
+        Every signal carries the generation of the request, so the receiver can drop stale results.
+
+        :param generation: Identifies the plot request the worker computes.
+        :param key: The key of the expressions in the sample cache.
+        :param function: Maps an array of x-values to an array with one row of y-values per expression.
+        """
+        super().__init__()
+        self.generation = generation
+        self.key = key
+        self.function = function
+        self.x_min = x_min
+        self.x_max = x_max
+        # The samples of the range known so far, cached or evaluated, as a list of disjoint (x, y) pieces.
+        self.known_samples = []
+
+    def run(self):
+        self.known_samples = [sample_cache.peek(self.key, self.x_min, self.x_max)]
+        try:
+            x_values, y_values = sample_cache.sample(self.key, self.evaluate_progressively, self.x_min, self.x_max)
+        except EvaluationCancelled:
+            return
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+            return
+
+        self.result_ready.emit(self.generation, x_values, y_values)
+
+    def evaluate_progressively(self, x_values):
+        """ Evaluates the points in passes of increasing resolution, publishing every pass but the last.
+
+        The first pass evaluates about `PREVIEW_SAMPLES` evenly spaced points, and every following pass
+        evaluates the points between those of the previous pass, `REFINEMENT_FACTOR` times as many in total.
+        Each point is evaluated exactly once, so the passes cost the same as evaluating all points at once.
+
+        The sample cache only asks for the part of the range it does not have, so every preview is merged with
+        the samples that are already known, and the cached part of the curve stays on screen.
+        """
+        length = len(x_values)
+        y_values = None
+        stride = 1
+        while length // (stride * REFINEMENT_FACTOR) >= PREVIEW_SAMPLES:
+            stride *= REFINEMENT_FACTOR
+
+        evaluated = 0
+        indices = np.arange(0, length, stride)
+        while True:
+            y_chunk = self.evaluate_in_chunks(x_values[indices], evaluated, length)
+            if y_values is None:
+                y_values = np.empty(y_chunk.shape[:-1] + (length,))
+            y_values[..., indices] = y_chunk
+            evaluated += len(indices)
+            if stride == 1:
+                self.known_samples.append((x_values, y_values))
+                return y_values
+
+            self.partial_result.emit(self.generation, *merge_samples(self.known_samples + [
+                (x_values[::stride], y_values[..., ::stride])]))
+            previous_stride, stride = stride, stride // REFINEMENT_FACTOR
+            indices = np.arange(0, length, stride)
+            indices = indices[indices % previous_stride != 0]
+
+    def evaluate_in_chunks(self, x_values, evaluated, total):
+        y_chunks = []
+        for start in range(0, len(x_values), EVALUATION_CHUNK_SIZE):
+            if self.isInterruptionRequested():
+                raise EvaluationCancelled()
+
+            stop = min(start + EVALUATION_CHUNK_SIZE, len(x_values))
+            y_chunks.append(self.function(x_values[start:stop]))
+            self.progress.emit(self.generation, 100 * (evaluated + stop) // total)
+
+        return np.concatenate(y_chunks, axis=-1)
 
 
 class PlotterWidget(QWidget):
@@ -48,6 +341,10 @@ class PlotterWidget(QWidget):
         self.error_label = QLabel(self)
         self.expr_text_box = QLineEdit(self)
         self.plot_button = QPushButton('Plot', self)
+        self.progress_bar = QProgressBar(self)
+        self.generation = 0
+        self.workers = set()
+        self.pending_function = (None, None)
         self.setFixedSize(1000, 750)
         self.canvas = Canvas(self, x_values, y_values)
         self.toolbar = NavigationToolbar(self.canvas, None, True)
@@ -86,6 +383,7 @@ class PlotterWidget(QWidget):
     def init_ui(self):
         self.init_text_box()
         self.init_plot_button()
+        self.init_progress_bar()
         self.init_error_label()
         self.init_f_of_x_label()
         self.init_background_color()
@@ -144,6 +442,11 @@ class PlotterWidget(QWidget):
         f.setPointSize(12)
         self.plot_button.setFont(f)
 
+    def init_progress_bar(self):
+        self.progress_bar.setGeometry(640, 650, 100, 30)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.hide()
+
     def init_error_label(self):
         self.error_label.setGeometry(0, 685, 1000, 50)
         self.error_label.setStyleSheet('QLabel { color: red }')
@@ -156,17 +459,18 @@ class PlotterWidget(QWidget):
     @pyqtSlot()
     def on_plot_click(self):
         textbox_value = self.expr_text_box.text()
+        expressions = [text for text in textbox_value.split(';') if text.strip() != '']
 
-        if textbox_value == '':
+        if len(expressions) == 0:
             return
 
-        parser = Parser(textbox_value)
-        ast = parser.parse()
-        errors = ast.errors
-
-        if len(errors) > 0:
-            self.error_label.setText(errors[0])
-            return
+        compiled = []
+        for i, text in enumerate(expressions):
+            try:
+                compiled.append(expression_cache.compile(text))
+            except Exception as e:
+                self.error_label.setText(str(e) if len(expressions) == 1 else f'Expression {i + 1}: {e}')
+                return
 
         if self.min_box.text() == '':
             self.error_label.setText('Error: Minimum x value(min) must be entered.')
@@ -179,12 +483,77 @@ class PlotterWidget(QWidget):
         x_min = float(self.min_box.text())
         x_max = float(self.max_box.text())
 
-        try:
-            x1, y1 = evaluate_in_range(ast, x_min, x_max)
-            self.canvas.x_values = x1
-            self.canvas.y_values = y1
-            self.canvas.show_plot()
-            self.error_label.setText('')
-        except Exception as e:
-            error_text = str(e)
-            self.error_label.setText(error_text)
+        key = tuple(normalize_expression(text) for text in expressions)
+        self.start_evaluation(key, vectorize_many(compiled), x_min, x_max)
+
+    def start_evaluation(self, key, function, x_min, x_max):
+        """ Cancels the evaluations in flight and starts evaluating the new plot request in the background. """
+        self.generation += 1
+        for worker in self.workers:
+            worker.requestInterruption()
+
+        worker = EvaluationWorker(self.generation, key, function, x_min, x_max)
+        worker.progress.connect(self.on_evaluation_progress)
+        worker.partial_result.connect(self.on_evaluation_partial_result)
+        worker.result_ready.connect(self.on_evaluation_result)
+        worker.failed.connect(self.on_evaluation_failed)
+        worker.finished.connect(functools.partial(self.on_worker_finished, worker))
+        self.workers.add(worker)
+
+        self.pending_function = (key, function)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        worker.start()
+
+    def closeEvent(self, event):
+        for worker in self.workers:
+            worker.requestInterruption()
+        for worker in list(self.workers):
+            worker.wait()
+        super().closeEvent(event)
+
+    def on_worker_finished(self, worker):
+        """ Forgets a worker whose thread has finished.
+
+        `finished` is emitted from the thread itself, before `run` has fully returned, so the worker is waited
+        for before its last reference is dropped. Destroying a QThread that is still running aborts.
+        """
+        worker.wait()
+        self.workers.discard(worker)
+
+    @pyqtSlot(int, int)
+    def on_evaluation_progress(self, generation, percent):
+        if generation == self.generation:
+            self.progress_bar.setValue(percent)
+
+    @pyqtSlot(int, object, object)
+    def on_evaluation_partial_result(self, generation, x_values, y_values):
+        if generation != self.generation:
+            return
+
+        self.canvas.function_key, self.canvas.function = None, None
+        self.canvas.labels = list(self.pending_function[0])
+        self.canvas.x_values = x_values
+        self.canvas.y_values = y_values
+        self.canvas.show_plot()
+
+    @pyqtSlot(int, object, object)
+    def on_evaluation_result(self, generation, x_values, y_values):
+        if generation != self.generation:
+            return
+
+        self.progress_bar.hide()
+        self.canvas.function_key, self.canvas.function = self.pending_function
+        self.canvas.labels = list(self.pending_function[0])
+        self.canvas.x_values = x_values
+        self.canvas.y_values = y_values
+        self.canvas.show_plot()
+        self.error_label.setText('')
+
+    @pyqtSlot(int, str)
+    def on_evaluation_failed(self, generation, error_text):
+        if generation != self.generation:
+            return
+
+        self.progress_bar.hide()
+        self.error_label.setText(error_text)
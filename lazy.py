@@ -0,0 +1,23 @@
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        """ Stands for a module that is imported the first time one of its attributes is used.
+
+        Heavy dependencies like NumPy take longer to import than the whole expression library, so the modules
+        that only need them in some functions refer to them through a `LazyModule`, e.g. `np = LazyModule('numpy')`,
+        instead of importing them at load time, see `test/test_import_time.py`.
+
+        :param name: The absolute name of the module.
+        """
+        self.__name = name
+        self.__module = None
+
+    def __getattr__(self, attribute):
+        if self.__module is None:
+            self.__module = importlib.import_module(self.__name)
+        return getattr(self.__module, attribute)
+
+    def __repr__(self):
+        return f'LazyModule({self.__name})'
@@ -1,12 +1,13 @@
 import os
 import subprocess
 import sys
-from PyQt5.QtWidgets import QApplication
-
-from gui import PlotterWidget
 
 
 def main():
+    from PyQt5.QtWidgets import QApplication
+
+    from gui import PlotterWidget
+
     app = QApplication(sys.argv)
     plotter_widget = PlotterWidget([], [])
     plotter_widget.show()
@@ -25,8 +26,24 @@ def run_tests():
                               f'{project_dir}/test']))
 
 
+def run_benchmarks(argv):
+    from benchmarks import bench_suite
+
+    sys.exit(bench_suite.main(argv))
+
+
+def run_batch(argv):
+    import batch
+
+    sys.exit(batch.main(argv))
+
+
 if __name__ == '__main__':
     if '--test' in sys.argv:
         run_tests()
+    elif '--bench' in sys.argv:
+        run_benchmarks(sys.argv[sys.argv.index('--bench') + 1:])
+    elif '--batch' in sys.argv:
+        run_batch(sys.argv[sys.argv.index('--batch') + 1:])
     else:
         main()
@@ -0,0 +1,154 @@
+from evaluator import vectorize
+from lazy import LazyModule
+
+np = LazyModule('numpy')
+
+
+def evaluate_adaptive(ast, min_x=0, max_x=1, tolerance=1e-3, max_points=20000, initial_points=65, max_depth=30,
+                      optimize=True, errors='mask'):
+    """ Evaluates an AST object in the defined range, placing points only where the curve needs them.
+
+    Sampling starts from a coarse uniform grid, whose points are checked against their neighbours to find
+    the intervals worth refining. Every round evaluates the midpoints of the intervals that are still being
+    refined, and keeps refining the halves of an interval when its midpoint is farther than `tolerance`
+    from the linear interpolation of its ends. Straight parts of the curve stay coarse,
+    while bends, steep slopes and discontinuities get more points.
+
+    :param ast: The AST object to evaluate, or its `CompiledExpression`.
+    :param min_x: Lower bound of the evaluation interval.
+    :param max_x: Upper bound of the evaluation interval.
+    :param tolerance: Allowed interpolation error, relative to the spread of the y-values on the initial grid,
+     or to the distance of the interval from them if it is farther away, e.g. close to a pole.
+    :param max_points: Upper bound on the total number of evaluated points.
+    :param initial_points: Number of points of the initial uniform grid.
+    :param max_depth: Maximum number of times an interval of the initial grid can be halved. This bounds the
+     work spent at discontinuities like the one of 1/x at 0, where the error never drops below the tolerance.
+    :param optimize: Whether to simplify the tree before evaluating it.
+    :param errors: The floating-point error policy, see `evaluator.evaluate_with_policy`.
+    :return: Sorted x-values within the interval [min_x, max_x], and the corresponding y values.
+    """
+    if min_x > max_x:
+        min_x, max_x = max_x, min_x
+
+    if min_x == max_x:
+        return [], []
+
+    evaluate = vectorize(ast, optimize, errors)
+    x_values = np.linspace(min_x, max_x, max(2, min(initial_points, max_points)))
+    y_values = evaluate(x_values)
+
+    finite_y = y_values[np.isfinite(y_values)]
+    y_scale = np.ptp(finite_y) if len(finite_y) > 0 else 0.0
+    y_scale = y_scale if y_scale > 0 else 1.0
+    y_center = np.median(finite_y) if len(finite_y) > 0 else 0.0
+
+    active, priorities = initial_intervals(y_values, tolerance, y_scale, y_center)
+    for _ in range(max_depth):
+        budget = max_points - len(x_values)
+        if len(active) == 0 or budget <= 0:
+            break
+
+        if len(active) > budget:
+            keep = np.sort(np.argpartition(-priorities, budget - 1)[:budget])
+            active = active[keep]
+
+        x_middle = (x_values[active] + x_values[active + 1]) / 2
+        y_middle = evaluate(x_middle)
+        errors = interpolation_errors(y_values[active], y_middle, y_values[active + 1])
+        tolerances = tolerance * np.maximum(y_scale, local_extents(y_values[active], y_middle, y_values[active + 1],
+                                                                   y_center))
+
+        shifted = active + np.arange(len(active))
+        x_values = np.insert(x_values, active + 1, x_middle)
+        y_values = np.insert(y_values, active + 1, y_middle)
+
+        refine = errors > tolerances
+        active = np.concatenate((shifted[refine], shifted[refine] + 1))
+        priorities = np.concatenate((errors[refine], errors[refine]))
+        order = np.argsort(active, kind='stable')
+        active = active[order]
+        priorities = priorities[order]
+
+    return x_values, y_values
+
+
+def initial_intervals(y_values, tolerance, y_scale, y_center):
+    """ Picks the intervals of the initial grid that need refining, and their priorities.
+
+    Every inner point of the grid is checked against the linear interpolation of its two neighbours, the
+    same test the refinement applies to midpoints, and the intervals on either side of a point that fails it
+    are refined. A grid of two points has no inner point, so its single interval is always refined.
+
+    :return: The indices of the intervals to refine, in increasing order, and their interpolation errors.
+    """
+    if len(y_values) < 3:
+        return np.arange(len(y_values) - 1), np.full(len(y_values) - 1, np.inf)
+
+    errors = interpolation_errors(y_values[:-2], y_values[1:-1], y_values[2:])
+    tolerances = tolerance * np.maximum(y_scale, local_extents(y_values[:-2], y_values[1:-1], y_values[2:],
+                                                               y_center))
+    errors = np.where(errors > tolerances, errors, 0.0)
+    # Interval i lies between the points i and i + 1, only the inner ones of which have an error.
+    priorities = np.maximum(np.concatenate(([0.0], errors)), np.concatenate((errors, [0.0])))
+    active = np.flatnonzero(priorities > 0)
+    return active, priorities[active]
+
+
+def interpolation_errors(y_left, y_middle, y_right):
+    """ Distance of the midpoint values from the linear interpolation of the interval ends.
+
+    Intervals where only some of the three values are finite contain a singularity or the edge of the
+    domain, their error is infinite. Intervals where none of the values is finite have no error.
+    """
+    with np.errstate(invalid='ignore', over='ignore'):
+        errors = np.abs(y_middle - (y_left + y_right) / 2)
+
+    finite = np.isfinite(y_left) & np.isfinite(y_middle) & np.isfinite(y_right)
+    undefined = ~np.isfinite(y_left) & ~np.isfinite(y_middle) & ~np.isfinite(y_right)
+    errors[~finite] = np.inf
+    errors[undefined] = 0.0
+    return errors
+
+
+def local_extents(y_left, y_middle, y_right, y_center):
+    """ The largest finite distance of the interval values from `y_center`, 0 where none is finite. """
+    extents = np.stack((y_left, y_middle, y_right)) - y_center
+    extents = np.abs(np.where(np.isfinite(extents), extents, 0.0))
+    return extents.max(axis=0)
+
+
+def decimate_min_max(x_values, y_values, n_bins):
+    """ Reduces sorted samples to at most a few points per bin, keeping the shape of the curve.
+
+    The samples are split into `n_bins` consecutive bins of equal size. Each bin keeps its minimum and its
+    maximum in their original order, and the first non-finite value if it has one, so that spikes and gaps
+    survive. The first and last samples are always kept. With one bin per horizontal pixel, the decimated
+    curve rasterizes like the full one.
+
+    :param x_values: Sorted x-values.
+    :param y_values: The corresponding y-values.
+    :param n_bins: The number of bins, usually the width of the plot in pixels.
+    :return: The kept x-values and y-values.
+    """
+    x_values = np.asarray(x_values, dtype=float)
+    y_values = np.asarray(y_values, dtype=float)
+    length = len(x_values)
+    if length <= 2 * n_bins:
+        return x_values, y_values
+
+    bin_size = -(-length // n_bins)
+    n_bins = -(-length // bin_size)
+    padded = np.full(n_bins * bin_size, np.nan)
+    padded[:length] = y_values
+    bins = padded.reshape(n_bins, bin_size)
+
+    finite = np.isfinite(bins)
+    offsets = np.arange(n_bins) * bin_size
+    minimums = np.where(finite, bins, np.inf).argmin(axis=1) + offsets
+    maximums = np.where(finite, bins, -np.inf).argmax(axis=1) + offsets
+    gaps = (~finite).argmax(axis=1) + offsets
+    gaps = gaps[~finite.all(axis=1) & (gaps < length)]
+
+    indices = np.unique(np.concatenate(([0, length - 1], minimums, maximums, gaps)))
+    indices = indices[indices < length]
+    return x_values[indices], y_values[indices]
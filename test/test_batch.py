@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from batch import evaluate_jobs, main, parse_jobs, write_results
+from evaluator import evaluate_in_range
+from expr_parser.parser import Parser
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_parse_jobs(self):
+        jobs, errors = parse_jobs(['# comment', '', '-1 1 x ^ 2 + 1', '0 2.5   1 / x', '1 x', 'a b x'])
+        self.assertEqual([job.expression for job in jobs], ['x ^ 2 + 1', '1 / x'])
+        self.assertEqual([(job.min_x, job.max_x) for job in jobs], [(-1, 1), (0, 2.5)])
+        self.assertEqual(jobs[1].line_number, 4)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('Line 5: Batch Error'))
+
+    def test_evaluate_jobs(self):
+        jobs, _ = parse_jobs(['-1 1 x ^ 2', '0 1 2 * x', '0 1 1 1', '0 1 x + y'])
+        for processes in [1, 2]:
+            results = evaluate_jobs(jobs, n_points=100, processes=processes)
+            self.assertEqual(len(results), 4)
+
+            x, y, error = results[0]
+            self.assertIsNone(error)
+            x_expected, y_expected = evaluate_in_range(Parser('x ^ 2').parse(), -1, 1, n_points=100)
+            self.assertTrue(np.array_equal(x, x_expected))
+            self.assertTrue(np.array_equal(y, y_expected))
+
+            self.assertTrue(results[2][2].startswith('Line 3: Parser Error'))
+            self.assertEqual(results[3][2], 'Line 4: Evaluation Error: Invalid identifier y')
+
+    def test_error_policy(self):
+        jobs, _ = parse_jobs(['-1 1 1 / x'])
+        _, y, error = evaluate_jobs(jobs, n_points=4, processes=1)[0]
+        self.assertIsNone(error)
+        self.assertTrue(np.isnan(y[2]))
+
+        _, _, error = evaluate_jobs(jobs, n_points=4, processes=1, errors='raise')[0]
+        self.assertEqual(error, 'Line 1: Evaluation Error: Divide by zero encountered in divide')
+
+    def test_write_formats(self):
+        jobs, _ = parse_jobs(['-1 1 x ^ 2', '0 1 1 1', '0 1 2 * x'])
+        results = evaluate_jobs(jobs, n_points=10, processes=1)
+
+        write_results(self.get_path('out.npz'), jobs, results)
+        with np.load(self.get_path('out.npz')) as archive:
+            self.assertEqual(list(archive['expressions']), ['x ^ 2', '1 1', '2 * x'])
+            self.assertTrue(np.array_equal(archive['y_2'], 2 * archive['x_2']))
+            self.assertNotIn('x_1', archive)
+
+        write_results(self.get_path('out.npy'), jobs, results)
+        array = np.load(self.get_path('out_0.npy'))
+        self.assertEqual(array.shape, (2, 10))
+        self.assertTrue(np.array_equal(array[1], array[0] ** 2))
+        self.assertFalse(os.path.exists(self.get_path('out_1.npy')))
+
+        write_results(self.get_path('out.csv'), jobs, results)
+        table = np.loadtxt(self.get_path('out.csv'), delimiter=',', skiprows=1)
+        self.assertEqual(table.shape, (20, 3))
+        self.assertTrue(np.array_equal(table[10:, 2], 2 * table[10:, 1]))
+
+    def test_main(self):
+        input_path = self.get_path('jobs.txt')
+        with open(input_path, 'w') as input_file:
+            input_file.write('0 1 x\n0 1 x ^ 3\n')
+
+        self.assertEqual(main([input_path, '-o', self.get_path('out.npz'), '-n', '50', '-j', '1']), 0)
+        with np.load(self.get_path('out.npz')) as archive:
+            self.assertEqual(len(archive['y_1']), 50)
+
+    def test_no_gui_imports(self):
+        code = 'import sys, batch; print(any(m in sys.modules for m in ("PyQt5", "matplotlib")))'
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=PROJECT_DIR)
+        self.assertEqual(output.strip(), b'False')
+
+    def test_cli_stdin(self):
+        output_path = self.get_path('out.csv')
+        process = subprocess.run([sys.executable, 'main.py', '--batch', '-o', output_path, '-n', '4'],
+                                 input=b'0 1 x\n0 1 x +\n', cwd=PROJECT_DIR, capture_output=True)
+        self.assertEqual(process.returncode, 1)
+        self.assertIn(b'Line 2: Parser Error', process.stderr)
+        self.assertEqual(np.loadtxt(output_path, delimiter=',', skiprows=1).shape, (4, 3))
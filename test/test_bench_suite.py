@@ -0,0 +1,53 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from benchmarks.bench_suite import build_corpus, compare, count_nodes, load_results, run, save_results
+from evaluator import Evaluator
+from expr_parser.parser import Parser
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBenchSuite(unittest.TestCase):
+
+    def test_corpus(self):
+        corpus = dict(build_corpus())
+        self.assertEqual(corpus['identifier'], 'x')
+        self.assertGreater(count_nodes(Parser(corpus['balanced_4096']).parse()), 4096)
+        for name, text in corpus.items():
+            ast = Parser(text).parse()
+            self.assertEqual(ast.errors, [], name)
+            evaluator = Evaluator(ast)
+            evaluator.set_var('x', 1.5)
+            evaluator.eval()
+
+    def test_run_and_save(self):
+        results = run('compiled/identifier', repeat=1, output=io.StringIO())
+        self.assertEqual(list(results['results']), ['compiled/identifier'])
+        self.assertEqual(results['results']['compiled/identifier']['nodes'], 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            save_results(path, results)
+            self.assertEqual(load_results(path), results)
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}, 'c': {'seconds': 1.0}}}
+        current = {'results': {'a': {'seconds': 1.05}, 'b': {'seconds': 1.5}, 'd': {'seconds': 1.0}}}
+        comparison = compare(baseline, current, threshold=0.1)
+        self.assertEqual([(key, regressed) for key, *_, regressed in comparison], [('a', False), ('b', True)])
+
+    def test_cli_compare(self):
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_path = os.path.join(directory, 'baseline.json')
+            current_path = os.path.join(directory, 'current.json')
+            save_results(baseline_path, {'results': {'a': {'seconds': 1.0}}})
+            save_results(current_path, {'results': {'a': {'seconds': 2.0}}})
+            process = subprocess.run([sys.executable, 'main.py', '--bench', '--compare', baseline_path, current_path],
+                                     cwd=PROJECT_DIR, capture_output=True, text=True)
+            self.assertEqual(process.returncode, 1)
+            self.assertIn('REGRESSION', process.stdout)
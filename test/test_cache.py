@@ -0,0 +1,201 @@
+import unittest
+
+import numpy as np
+
+from cache import ExpressionCache, SampleCache, grid_step, normalize_expression
+from evaluator import evaluate_in_range
+from expr_parser.parser import Parser
+
+
+class TestExpressionCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = ExpressionCache()
+        compiled = cache.compile('x ^ 2 + 1')
+        self.assertEqual(cache.info(), (0, 1, 128, 1))
+
+        self.assertIs(cache.compile('x ^ 2 + 1'), compiled)
+        self.assertIs(cache.parse('x ^ 2 + 1'), compiled.ast)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+
+    def test_normalized_key(self):
+        cache = ExpressionCache()
+        compiled = cache.compile('x^2 + 1')
+        self.assertIs(cache.compile('  x^2   +\t1\n'), compiled)
+        self.assertIsNot(cache.compile('x^2 +1'), compiled)
+
+    def test_normalize_expression(self):
+        self.assertEqual(normalize_expression(' 1 \t+\r\n 2 '), '1 + 2')
+        self.assertEqual(normalize_expression('1 1'), '1 1')
+        self.assertEqual(normalize_expression('1\x0c+ 1'), '1\x0c+ 1')
+
+    def test_lru_eviction(self):
+        cache = ExpressionCache(maxsize=2)
+        first = cache.compile('x + 1')
+        cache.compile('x + 2')
+        cache.compile('x + 1')
+        cache.compile('x + 3')
+        self.assertEqual(cache.info().currsize, 2)
+
+        self.assertIs(cache.compile('x + 1'), first)
+        misses = cache.misses
+        cache.compile('x + 2')
+        self.assertEqual(cache.misses, misses + 1)
+
+    def test_errors_are_not_cached(self):
+        cache = ExpressionCache()
+        ast = cache.parse('  1 + $')
+        self.assertEqual(ast.errors, Parser('  1 + $').parse().errors)
+        self.assertEqual(cache.info().currsize, 0)
+
+        with self.assertRaises(Exception) as context:
+            cache.compile('1 1')
+        self.assertEqual(str(context.exception), Parser('1 1').parse().errors[0])
+
+    def test_evaluate_compiled(self):
+        cache = ExpressionCache()
+        x, y = evaluate_in_range(cache.compile('x ^ 2 - 3 * x'), -5, 5, n_points=1000)
+        _, y_expected = evaluate_in_range(Parser('x ^ 2 - 3 * x').parse(), -5, 5, n_points=1000)
+        self.assertTrue(np.array_equal(y, y_expected))
+
+    def test_clear(self):
+        cache = ExpressionCache()
+        cache.compile('x')
+        cache.compile('x')
+        cache.clear()
+        self.assertEqual(cache.info(), (0, 0, 128, 0))
+
+
+class TestSampleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def function(x_values):
+            self.calls.append(len(x_values))
+            return x_values ** 2
+
+        self.function = function
+
+    def test_grid(self):
+        cache = SampleCache()
+        x, y = cache.sample('x^2', self.function, -1, 1, n_points=1000)
+        self.assertEqual(grid_step(2 / 1000), 2 ** -8)
+        self.assertTrue(np.array_equal(x, np.arange(-256, 256) / 256))
+        self.assertTrue(np.array_equal(y, x ** 2))
+        self.assertFalse(y.flags.writeable)
+
+    def test_full_reuse(self):
+        cache = SampleCache()
+        cache.sample('x^2', self.function, -1, 1, n_points=1000)
+        x, y = cache.sample('x^2', self.function, -0.98, 0.98, n_points=1000)
+        self.assertEqual(self.calls, [512])
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(np.all(x >= -0.98) and np.all(x < 0.98))
+        self.assertTrue(np.array_equal(y, x ** 2))
+
+    def test_overlap_reuse(self):
+        cache = SampleCache()
+        cache.sample('x^2', self.function, 0, 1, n_points=1000)
+        x, y = cache.sample('x^2', self.function, 0.5, 1.5, n_points=1000)
+        self.assertEqual(self.calls, [512, 256])
+        self.assertEqual(cache.partial_hits, 1)
+        self.assertEqual(x[0], 0.5)
+        self.assertTrue(np.array_equal(y, x ** 2))
+
+        x, y = cache.sample('x^2', self.function, -0.25, 1.25, n_points=1000)
+        self.assertEqual(self.calls, [512, 256, 128])
+        self.assertTrue(np.array_equal(y, x ** 2))
+        self.assertEqual(cache.evaluated_points, 512 + 256 + 128)
+
+    def test_disjoint_ranges(self):
+        cache = SampleCache()
+        cache.sample('x^2', self.function, 0, 1, n_points=1000)
+        x, y = cache.sample('x^2', self.function, 5, 6, n_points=1000)
+        self.assertEqual(cache.misses, 2)
+        self.assertTrue(np.array_equal(y, x ** 2))
+        self.assertEqual(cache.cached_points, 512)
+
+    def test_keys_are_separate(self):
+        cache = SampleCache()
+        cache.sample('x^2', self.function, 0, 1, n_points=1000)
+        cache.sample('x^3', self.function, 0, 1, n_points=1000)
+        cache.sample('x^2', self.function, 0, 1, n_points=100)
+        self.assertEqual(cache.misses, 3)
+
+    def test_eviction(self):
+        cache = SampleCache(max_points=1000)
+        cache.sample('a', self.function, 0, 1, n_points=1000)
+        cache.sample('b', self.function, 0, 1, n_points=1000)
+        self.assertEqual(cache.cached_points, 512)
+
+        cache.sample('b', self.function, 0, 1, n_points=1000)
+        self.assertEqual(cache.hits, 1)
+        cache.sample('a', self.function, 0, 1, n_points=1000)
+        self.assertEqual(cache.misses, 3)
+
+    def test_single_range_above_limit(self):
+        cache = SampleCache(max_points=600)
+        cache.sample('x^2', self.function, 0, 1, n_points=1000)
+        x, y = cache.sample('x^2', self.function, 0.5, 1.5, n_points=1000)
+        self.assertEqual(cache.cached_points, 512)
+        self.assertTrue(np.array_equal(y, x ** 2))
+
+    def test_empty_range(self):
+        cache = SampleCache()
+        x, y = cache.sample('x^2', self.function, 1, 1)
+        self.assertEqual(x, [])
+        self.assertEqual(y, [])
+
+    def test_rows(self):
+        def function(x_values):
+            self.calls.append(len(x_values))
+            return np.stack((x_values, x_values ** 2))
+
+        cache = SampleCache(max_points=1024)
+        cache.sample(('x', 'x^2'), function, 0, 1, n_points=1000)
+        x, y = cache.sample(('x', 'x^2'), function, 0.5, 1.5, n_points=1000)
+        self.assertEqual(self.calls, [512, 256])
+        self.assertEqual(y.shape, (2, 512))
+        self.assertTrue(np.array_equal(y, np.stack((x, x ** 2))))
+        self.assertEqual(cache.cached_points, 1024)
+
+    def test_concurrent_runs_are_merged(self):
+        cache = SampleCache()
+
+        def function(x_values):
+            # Another caller stores a longer run of the same grid while this evaluation is in progress.
+            if len(self.calls) == 0:
+                cache.sample('x^2', self.function, -1, 2, n_points=192)
+            return self.function(x_values)
+
+        x, y = cache.sample('x^2', function, 0, 1, n_points=64)
+        self.assertTrue(np.array_equal(y, x ** 2))
+        self.assertEqual(cache.cached_points, 192)
+
+        x, y = cache.sample('x^2', self.function, -1, 2, n_points=192)
+        self.assertEqual(cache.hits, 1)
+        self.assertTrue(np.array_equal(y, x ** 2))
+
+    def test_failed_evaluations_are_not_counted(self):
+        cache = SampleCache()
+
+        def function(x_values):
+            raise Exception('Cancelled')
+
+        self.assertRaises(Exception, lambda: cache.sample('x^2', function, 0, 1, n_points=1000))
+        self.assertEqual(cache.evaluated_points, 0)
+        self.assertEqual(cache.cached_points, 0)
+
+    def test_peek(self):
+        cache = SampleCache()
+        x, y = cache.peek('x^2', 0, 1, n_points=1000)
+        self.assertEqual(len(x), 0)
+
+        cache.sample('x^2', self.function, 0, 1, n_points=1000)
+        x, y = cache.peek('x^2', 0.5, 1.5, n_points=1000)
+        self.assertEqual(self.calls, [512])
+        self.assertEqual((x[0], x[-1]), (0.5, 511 / 512))
+        self.assertTrue(np.array_equal(y, x ** 2))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
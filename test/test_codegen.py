@@ -0,0 +1,102 @@
+import math
+import unittest
+
+import numpy as np
+
+from codegen import MAX_INLINE_HEIGHT, generate, get_parameter_names
+from evaluator import Evaluator, evaluate_vectorized
+from expr_parser.AST import AST
+from expr_parser.nodes import *
+from expr_parser.parser import Parser
+from expr_parser.tokens import Token, TokenKind
+
+
+class TestCodegen(unittest.TestCase):
+
+    @staticmethod
+    def get_results(expr, **variables):
+        ast = Parser(expr).parse()
+        evaluator = Evaluator(ast)
+        for name, value in variables.items():
+            evaluator.set_var(name, value)
+        return (evaluator.eval(), generate(ast).eval(**variables),
+                generate(ast, optimize=False, cse=False).eval(**variables))
+
+    def test_matches_evaluator(self):
+        expressions = [
+            '12 + 3',
+            '3 + 2 * 4',
+            '(4 + 2) * 3',
+            '2 ^ -10 + 1233123',
+            '5 * x ^ (2 * (3 + 4))',
+            '-2 * x ^ -3',
+            '-x ^ 2 - -x',
+            '-------------+++++++++++++++++++-----++-+-------------------3',
+            '(x - 1) / (2 - x) - 4 / x',
+            '(x ^ 2 + 1) ^ 3 / (x ^ 2 + 1)',
+            'exp(-x ^ 2 / 2) / sqrt(2 * pi) + log(abs(x)) * e',
+        ]
+        for expr in expressions:
+            variables = {'x': 3.141592} if 'x' in expr else {}
+            expected, result, unoptimized_result = self.get_results(expr, **variables)
+            self.assertEqual(result, expected, expr)
+            self.assertEqual(unoptimized_result, expected, expr)
+
+    def test_source(self):
+        generated = generate(Parser('(x*x + 3)/x').parse())
+        self.assertEqual(generated.source, 'def expression(x):\n    return (((x * x) + 3.0) / x)\n')
+        self.assertEqual(generated.function(2.0), 3.5)
+
+        generated = generate(Parser('sin(x) ^ 2 + sin(x) * cos(x)').parse())
+        self.assertEqual(generated.source.count('_f0(x)'), 1)
+        self.assertEqual(generated.eval(x=1.0), math.sin(1.0) ** 2 + math.sin(1.0) * math.cos(1.0))
+
+    def test_arrays(self):
+        ast = Parser('x ^ 3 - 2 * x + 1 / (x + 11) + sin(x)').parse()
+        x_values = np.linspace(-10, 10, 1001)
+        self.assertTrue(np.allclose(generate(ast).eval(x=x_values), evaluate_vectorized(ast, x_values),
+                                    rtol=1e-12, atol=0.0))
+
+    def test_identifiers(self):
+        expected, result, _ = self.get_results('if * lambda - _t + None', **{
+            'if': 2.0, 'lambda': 3.0, '_t': 5.0, 'None': 7.0})
+        self.assertEqual(result, expected)
+        self.assertEqual(get_parameter_names({'x', 'if', 'é', '_v'}),
+                         {'_v': '_v0', 'if': '_v1', 'x': 'x', 'é': '_v3'})
+
+        generated = generate(Parser('x * y').parse())
+        self.assertRaises(KeyError, lambda: generated.eval(x=1.0, y=2.0, z=3.0))
+        self.assertRaises(Exception, lambda: generated.eval(x=1.0))
+
+    def test_non_finite_numbers(self):
+        # 10^308 * 10 is folded into inf, which has no literal.
+        generated = generate(Parser('10 ^ 308 * 10 - x').parse())
+        self.assertNotIn('inf', generated.source)
+        self.assertEqual(generated.eval(x=1.0), math.inf)
+
+        ast = AST([], NumberExpressionNode(Token(TokenKind.NUMBER, -0.0, 0)), None, set())
+        self.assertEqual(math.copysign(1.0, generate(ast).eval()), -1.0)
+
+    def test_injection(self):
+        # Only the tree is used, and its values are validated before they reach the source.
+        number = NumberExpressionNode(Token(TokenKind.NUMBER, '__import__("os")', 0))
+        self.assertRaises(ValueError, lambda: generate(AST([], number, None, set()), optimize=False, cse=False))
+
+        name = 'x): import os #'
+        ast = AST([], IdentifierNode(Token(TokenKind.IDENTIFIER, name, 0)), None, {name})
+        generated = generate(ast)
+        self.assertNotIn('import', generated.source)
+        self.assertEqual(generated.eval(**{name: 4.0}), 4.0)
+
+    def test_deep_expressions(self):
+        # Each expression has more than 10^5 nodes.
+        depth = 40000
+        generated = generate(Parser('(1 + ' * depth + 'x' + ')' * depth).parse())
+        self.assertEqual(generated.eval(x=0.5), depth + 0.5)
+        self.assertLess(max(line.count('(') for line in generated.source.splitlines()), 2 * MAX_INLINE_HEIGHT)
+
+        generated = generate(Parser('-' * (4 * depth + 1) + 'x').parse(), optimize=False)
+        self.assertEqual(generated.eval(x=2.0), -2.0)
+
+        generated = generate(Parser(' - '.join(['x'] * 2 * depth)).parse(), cse=False)
+        self.assertEqual(generated.eval(x=1.0), 2.0 - 2 * depth)
@@ -0,0 +1,99 @@
+import unittest
+
+import numpy as np
+
+from compiler import compile_ast, compile_group
+from evaluator import Evaluator
+from expr_parser.parser import Parser
+
+
+class TestCompiler(unittest.TestCase):
+
+    @staticmethod
+    def get_results(expr, **variables):
+        ast = Parser(expr).parse()
+        evaluator = Evaluator(ast)
+        for name, value in variables.items():
+            evaluator.set_var(name, value)
+        return evaluator.eval(), compile_ast(ast).eval(**variables)
+
+    def test_matches_evaluator(self):
+        expressions = [
+            '12 + 3',
+            '3 + 2 * 4',
+            '(4 + 2) * 3',
+            '2 ^ -10 + 1233123',
+            '5 * x ^ (2 * (3 + 4))',
+            '-2 * x ^ -3',
+            '-------------+++++++++++++++++++-----++-+-------------------3',
+            '(x - 1) / (2 - x) - 4 / x',
+        ]
+        for expr in expressions:
+            expected, result = self.get_results(expr, x=3.141592) if 'x' in expr else self.get_results(expr)
+            self.assertEqual(result, expected, expr)
+
+    def test_multiple_identifiers(self):
+        expected, result = self.get_results('x * y - z ^ 2', x=2.0, y=3.0, z=4.0)
+        self.assertEqual(result, expected)
+
+    def test_reuse(self):
+        compiled = compile_ast(Parser('x ^ 2 + 1').parse())
+        self.assertEqual(compiled.eval(x=2), 5)
+        self.assertEqual(compiled.eval(x=3), 10)
+
+    def test_array_input(self):
+        compiled = compile_ast(Parser('2 * x + 1').parse())
+        result = compiled.eval(x=np.array([0.0, 1.0, 2.0]))
+        self.assertTrue(np.array_equal(result, [1.0, 3.0, 5.0]))
+
+    def test_expect_invalid_identifier(self):
+        compiled = compile_ast(Parser('2 * 4').parse())
+        self.assertRaises(KeyError, lambda: compiled.eval(x=123))
+
+    def test_expect_missing_identifier(self):
+        compiled = compile_ast(Parser('2 * x').parse())
+        self.assertRaises(Exception, compiled.eval)
+
+    def test_group(self):
+        expressions = ['x ^ 2 + 1', 'x ^ 2 - y', '3', 'x ^ 2 + 1']
+        group = compile_group([Parser(expr).parse() for expr in expressions])
+        self.assertEqual(len(group), 4)
+        self.assertEqual(group.identifiers, {'x', 'y'})
+        self.assertEqual(group.eval(x=3.0, y=2.0), [10.0, 7.0, 3, 10.0])
+        self.assertRaises(KeyError, lambda: group.eval(x=1.0, y=2.0, z=3.0))
+        self.assertRaises(Exception, lambda: group.eval(x=1.0))
+
+    def test_group_shares_subexpressions(self):
+        calls = []
+
+        class CountingValue(float):
+            def __pow__(self, other):
+                calls.append(other)
+                return float(self) ** other
+
+        group = compile_group([compile_ast(Parser(expr).parse()) for expr in ['x ^ 2 + 1', '(x ^ 2) * 3']])
+        self.assertEqual(group.eval(x=CountingValue(2.0)), [5.0, 12.0])
+        self.assertEqual(calls, [2.0])
+        self.assertGreater(group.dag.deduplicated_nodes, 0)
+
+    def test_deep_expressions(self):
+        # Each expression has more than 10^5 nodes.
+        depth = 25000
+        expressions = ['(x * x - ' * depth + 'x' + ')' * depth, '-' * (4 * depth + 1) + 'x']
+        for expr in expressions:
+            ast = Parser(expr).parse()
+            evaluator = Evaluator(ast)
+            evaluator.set_var('x', 0.5)
+            expected = evaluator.eval()
+            for optimize, cse in [(True, True), (False, False)]:
+                compiled = compile_ast(ast, optimize, cse)
+                self.assertEqual(compiled.eval(x=0.5), expected)
+                self.assertEqual(compiled.eval(x=np.array([0.5, 0.5]))[1], expected)
+
+    def test_deep_group(self):
+        depth = 10000
+        deep = Parser('(x - ' * depth + '1' + ')' * depth).parse()
+        group = compile_group([Parser('x + 1').parse(), deep, deep])
+        evaluator = Evaluator(deep)
+        evaluator.set_var('x', 2.0)
+        self.assertEqual(group.eval(x=2.0), [3.0, evaluator.eval(), evaluator.eval()])
@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from compiler import compile_ast
+from expr_parser.dag import build_dag
+from expr_parser.nodes import *
+from expr_parser.optimizer import optimize
+from expr_parser.parser import Parser
+
+
+class TestDAG(unittest.TestCase):
+
+    def test_share_identical_subtrees(self):
+        dag = build_dag(Parser('(x^2+1)^3 / (x^2+1)').parse())
+        root_node = dag.ast.main_expression
+
+        self.assertTrue(isinstance(root_node, BinaryExpressionNode))
+        self.assertIs(root_node.left_expression.left_expression, root_node.right_expression)
+        self.assertTrue(dag.is_shared(root_node.right_expression))
+        self.assertFalse(dag.is_shared(root_node))
+
+    def test_node_counts(self):
+        dag = build_dag(Parser('(x^2+1)^3 / (x^2+1)').parse())
+        # x, 2, x^2, 1, x^2+1 twice, 3, ^3 and the division.
+        self.assertEqual(dag.total_nodes, 13)
+        # x, 2, x^2, 1, x^2+1, 3, ^3 and the division.
+        self.assertEqual(dag.unique_nodes, 8)
+        self.assertEqual(dag.deduplicated_nodes, 5)
+
+    def test_no_sharing(self):
+        dag = build_dag(Parser('1 + x * 2').parse())
+        self.assertEqual(dag.deduplicated_nodes, 0)
+
+    def test_distinct_operators(self):
+        dag = build_dag(Parser('(x - 1) * (x + 1) / (x - 1)').parse())
+        root_node = dag.ast.main_expression
+        product = root_node.left_expression
+        self.assertIsNot(product.left_expression, product.right_expression)
+        self.assertIs(product.left_expression, root_node.right_expression)
+
+    def test_signed_zeros_are_distinct(self):
+        dag = build_dag(optimize(Parser('(1 / 0) + (1 / -0)').parse()))
+        root_node = dag.ast.main_expression
+        self.assertIsNot(root_node.left_expression, root_node.right_expression)
+
+    def test_compiled_matches_tree(self):
+        expressions = ['(x^2+1)^3 / (x^2+1)', '(x - 1) * (x + 1) / (x - 1) - (x - 1)', 'x * x * x * x']
+        x_values = np.linspace(-3, 3, 101)
+        for expr in expressions:
+            ast = Parser(expr).parse()
+            compiled = compile_ast(ast)
+            compiled_tree = compile_ast(ast, cse=False)
+            self.assertGreater(compiled.dag.deduplicated_nodes, 0)
+            self.assertIsNone(compiled_tree.dag)
+            self.assertEqual(compiled.eval(x=1.5), compiled_tree.eval(x=1.5))
+            self.assertTrue(np.array_equal(compiled.eval(x=x_values), compiled_tree.eval(x=x_values)))
+
+    def test_shared_subexpression_evaluated_once(self):
+        calls = []
+
+        class CountingValue(float):
+            def __pow__(self, other):
+                calls.append(other)
+                return float(self) ** other
+
+        compiled = compile_ast(Parser('(x^2+1)^3 / (x^2+1)').parse())
+        self.assertEqual(compiled.eval(x=CountingValue(2.0)), 5.0 ** 2)
+        self.assertEqual(calls, [2.0])
+
+    def test_share_across_trees(self):
+        dag = build_dag()
+        first = dag.add(Parser('x ^ 2 + 1').parse()).main_expression
+        second = dag.add(Parser('3 * (x ^ 2)').parse()).main_expression
+        self.assertIs(first.left_expression, second.right_expression)
+        self.assertTrue(dag.is_shared(second.right_expression))
+        self.assertIsNone(dag.ast)
+
+    def test_deep_expression(self):
+        depth = 25000
+        dag = build_dag(Parser('(x + x * ' * depth + '1' + ')' * depth).parse())
+        self.assertEqual(dag.total_nodes, 4 * depth + 1)
+        # x, 1, and one product and one sum per level.
+        self.assertEqual(dag.unique_nodes, 2 * depth + 2)
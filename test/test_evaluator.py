@@ -2,7 +2,8 @@ import unittest
 
 import numpy as np
 
-from evaluator import Evaluator, evaluate_in_range
+from evaluator import (Evaluator, evaluate_in_range, evaluate_on_grid, evaluate_parallel, evaluate_vectorized, get_pool,
+                       iter_range, vectorize_many)
 from expr_parser.parser import Parser
 
 
@@ -107,7 +108,7 @@ class TestEvaluator(unittest.TestCase):
             y_expected.append(internal_result(x_value))
 
         self.assertTrue(np.array_equal(x_expected, x))
-        self.assertTrue(np.array_equal(y_expected, y))
+        self.assertTrue(np.allclose(y_expected, y, rtol=1e-12, atol=0.0))
 
     def test_empty_range(self):
         expr = '1 + 2'
@@ -117,3 +118,213 @@ class TestEvaluator(unittest.TestCase):
         x, y = evaluate_in_range(ast, 1, 1, n_points=10000)
         self.assertEqual(x, [])
         self.assertEqual(y, [])
+
+    def test_vectorized_matches_scalar(self):
+        expr = '-2 * x ^ -3 + (x - 4) / 7 - +x'
+        x_values = np.linspace(0.5, 20, 500)
+
+        ast = Parser(expr).parse()
+        y = evaluate_vectorized(ast, x_values)
+
+        y_expected = [self.get_result(expr, 'x', x_value) for x_value in x_values]
+        self.assertEqual(y.shape, x_values.shape)
+        self.assertTrue(np.allclose(y_expected, y, rtol=1e-12, atol=0.0))
+
+    def test_constant_range(self):
+        ast = Parser('1 + 2').parse()
+        x, y = evaluate_in_range(ast, 0, 1, n_points=100)
+        self.assertEqual(len(x), len(y))
+        self.assertTrue(np.all(y == 3))
+
+    def test_range_singularity(self):
+        ast = Parser('1 / x').parse()
+        x, y = evaluate_in_range(ast, -1, 1, n_points=4)
+        self.assertTrue(np.array_equal(x, [-1, -0.5, 0, 0.5]))
+        self.assertTrue(np.isnan(y[2]))
+        self.assertEqual(y[0], -1)
+
+        _, y = evaluate_in_range(ast, -1, 1, n_points=4, errors='clip')
+        self.assertEqual(y[2], np.finfo(float).max)
+        self.assertRaises(Exception, lambda: evaluate_in_range(ast, -1, 1, n_points=4, errors='raise'))
+        self.assertRaises(ValueError, lambda: evaluate_in_range(ast, -1, 1, n_points=4, errors='ignore'))
+
+    def test_error_policies(self):
+        x_values = np.array([-1.0, 0.0, 4.0])
+        expected = {
+            'x ^ -0.5': [np.nan, np.nan, 0.5],
+            'x + 1 / 0': [np.nan, np.nan, np.nan],
+            '1 / (1 / 0) + x': [-1.0, 0.0, 4.0],
+            '(0 - 8) ^ (1 / 3) + x': [np.nan, np.nan, np.nan],
+            '10 ^ 400 - x': [np.nan, np.nan, np.nan],
+        }
+        for expr, y_expected in expected.items():
+            ast = Parser(expr).parse()
+            for optimize in (True, False):
+                y = evaluate_vectorized(ast, x_values, optimize=optimize)
+                self.assertTrue(np.array_equal(y, y_expected, equal_nan=True), expr)
+                self.assertTrue(np.array_equal(Evaluator(ast).eval_many({'x': x_values}), y_expected, equal_nan=True))
+
+        limit = np.finfo(float).max
+        y = evaluate_vectorized(Parser('10 ^ 400 - x').parse(), x_values, errors='clip')
+        self.assertTrue(np.array_equal(y, [limit] * 3))
+        self.assertTrue(np.array_equal(evaluate_vectorized(Parser('x ^ -0.5').parse(), x_values, errors='clip'),
+                                       [np.nan, limit, 0.5], equal_nan=True))
+
+        for expr in expected:
+            if expr != '1 / (1 / 0) + x':
+                ast = Parser(expr).parse()
+                self.assertRaises(Exception, lambda: evaluate_vectorized(ast, x_values, errors='raise'))
+        y = evaluate_vectorized(Parser('x ^ 2').parse(), x_values, errors='raise')
+        self.assertTrue(np.array_equal(y, [1.0, 0.0, 16.0]))
+
+        y_values = vectorize_many([Parser('x + 1 / 0').parse(), Parser('1 / x').parse()])(x_values)
+        self.assertTrue(np.array_equal(y_values, [[np.nan] * 3, [-1.0, np.nan, 0.25]], equal_nan=True))
+        _, values = evaluate_on_grid(Parser('1 / x + y').parse(), {'x': (0, 1), 'y': (0, 1)}, n_points=2)
+        self.assertTrue(np.array_equal(values, [[np.nan, np.nan], [2.0, 2.5]], equal_nan=True))
+
+    def test_parallel_range(self):
+        ast = Parser('x ^ 3 - 2 * x + 1 / x').parse()
+        x, y = evaluate_in_range(ast, -10, 10, n_points=10001, parallel=True)
+        _, y_expected = evaluate_in_range(ast, -10, 10, n_points=10001)
+        self.assertTrue(np.array_equal(y, y_expected, equal_nan=True))
+
+        x_values = np.linspace(0, 1, 37)
+        self.assertTrue(np.array_equal(evaluate_parallel(ast, x_values, chunk_size=5),
+                                       evaluate_vectorized(ast, x_values), equal_nan=True))
+
+    def test_parallel_pool_is_reused(self):
+        ast = Parser('x + 1').parse()
+        evaluate_in_range(ast, 0, 1, n_points=100, parallel=True)
+        pool, _ = get_pool()
+        evaluate_in_range(ast, 0, 1, n_points=100, parallel=True)
+        self.assertIs(get_pool()[0], pool)
+
+    def test_parallel_error(self):
+        ast = Parser('x + y').parse()
+        self.assertRaises(Exception, lambda: evaluate_in_range(ast, 0, 1, n_points=100, parallel=True))
+
+    def test_parallel_deep_expressions(self):
+        # Pickling a tree this deep exceeds the recursion limit, the workers get a flat program instead.
+        depth = 5000
+        ast = Parser('-' * (2 * depth + 1) + 'x + ' + '(' * depth + 'x' + ')' * depth).parse()
+        x_values = np.linspace(-1, 1, 101)
+        self.assertTrue(np.array_equal(evaluate_parallel(ast, x_values, optimize=False), np.zeros(101)))
+
+        ast = Parser(' + '.join(['1 / x'] * 3 * depth)).parse()
+        x_values = np.linspace(1, 2, 101)
+        self.assertTrue(np.allclose(evaluate_parallel(ast, x_values, chunk_size=10), 3 * depth / x_values))
+
+    def test_iter_range(self):
+        ast = Parser('x ^ 3 - 2 * x + 1 / x').parse()
+        x_expected, y_expected = evaluate_in_range(ast, -7.3, 12.1, n_points=10007)
+
+        chunks = list(iter_range(ast, -7.3, 12.1, n_points=10007, chunk_size=1000))
+        self.assertEqual(len(chunks), 11)
+        self.assertTrue(all(len(x_chunk) == len(y_chunk) <= 1000 for x_chunk, y_chunk in chunks))
+
+        x = np.concatenate([x_chunk for x_chunk, _ in chunks])
+        y = np.concatenate([y_chunk for _, y_chunk in chunks])
+        self.assertTrue(np.array_equal(x, x_expected))
+        self.assertTrue(np.array_equal(y, y_expected, equal_nan=True))
+
+    def test_iter_range_reduction(self):
+        ast = Parser('x ^ 2').parse()
+        maximum = -np.inf
+        integral = 0.0
+        previous = None
+        for x_chunk, y_chunk in iter_range(ast, 0, 3, n_points=300000, chunk_size=4096):
+            maximum = max(maximum, y_chunk.max())
+            if previous is not None:
+                x_chunk = np.concatenate(([previous[0]], x_chunk))
+                y_chunk = np.concatenate(([previous[1]], y_chunk))
+            integral += np.sum((y_chunk[1:] + y_chunk[:-1]) * np.diff(x_chunk)) / 2
+            previous = x_chunk[-1], y_chunk[-1]
+
+        self.assertAlmostEqual(maximum, 9, places=3)
+        self.assertAlmostEqual(integral, 9, places=3)
+
+    def test_iter_empty_range(self):
+        ast = Parser('x').parse()
+        self.assertEqual(list(iter_range(ast, 1, 1)), [])
+
+    def test_grid(self):
+        ast = Parser('x ^ 2 - x * y + 2 * y').parse()
+        (x, y), z = evaluate_on_grid(ast, {'x': (-1, 1), 'y': (0, 3)}, n_points={'x': 40, 'y': 30})
+        self.assertEqual(z.shape, (40, 30))
+        self.assertTrue(np.array_equal(x, evaluate_in_range(Parser('x').parse(), -1, 1, n_points=40)[0]))
+
+        evaluator = Evaluator(ast)
+        for i, j in [(0, 0), (13, 29), (39, 7)]:
+            evaluator.set_var('x', x[i])
+            evaluator.set_var('y', y[j])
+            self.assertAlmostEqual(z[i, j], evaluator.eval(), places=12)
+
+    def test_grid_matches_range(self):
+        ast = Parser('1 / x + x ^ 3').parse()
+        x_expected, y_expected = evaluate_in_range(ast, -2, 2, n_points=1000)
+        (x, t), y = evaluate_on_grid(ast, {'x': (-2, 2), 't': (0, 1)}, n_points={'x': 1000, 't': 5})
+        self.assertEqual(y.shape, (1000, 5))
+        self.assertTrue(np.array_equal(y, np.repeat(y_expected[:, None], 5, axis=1)))
+
+    def test_grid_constant_and_empty(self):
+        (x, y), z = evaluate_on_grid(Parser('3').parse(), {'x': (0, 1), 'y': (0, 1)}, n_points=8)
+        self.assertTrue(np.array_equal(z, np.full((8, 8), 3.0)))
+
+        axes, z = evaluate_on_grid(Parser('x * y').parse(), {'x': (0, 1), 'y': (2, 2)}, n_points=8)
+        self.assertEqual(z.shape, (8, 0))
+
+    def test_grid_missing_identifier(self):
+        ast = Parser('x * y').parse()
+        self.assertRaises(Exception, lambda: evaluate_on_grid(ast, {'x': (0, 1)}))
+
+    def test_vectorize_many(self):
+        expressions = ['x ^ 2', '1 / x', '2', 'x ^ 2 - 3 * x']
+        x_values = np.linspace(-2, 2, 101)
+        y_values = vectorize_many([Parser(expr).parse() for expr in expressions])(x_values)
+        self.assertEqual(y_values.shape, (4, 101))
+        for expr, row in zip(expressions, y_values):
+            self.assertTrue(np.array_equal(row, evaluate_vectorized(Parser(expr).parse(), x_values), equal_nan=True),
+                            expr)
+
+    def test_eval_many(self):
+        evaluator = Evaluator(Parser('a * x ^ 2 + b / x').parse())
+        rng = np.random.default_rng(0)
+        bindings = {'a': rng.normal(size=1000), 'b': rng.normal(size=1000), 'x': rng.uniform(1, 2, size=1000)}
+        values = evaluator.eval_many(bindings)
+        self.assertEqual(values.shape, (1000,))
+        for i in range(0, 1000, 97):
+            for name, column in bindings.items():
+                evaluator.set_var(name, column[i])
+            self.assertAlmostEqual(values[i], evaluator.eval())
+
+        structured = np.zeros(1000, dtype=[('a', float), ('b', float), ('x', float)])
+        for name, column in bindings.items():
+            structured[name] = column
+        self.assertTrue(np.array_equal(evaluator.eval_many(structured), values))
+
+    def test_eval_many_broadcast_and_errors(self):
+        evaluator = Evaluator(Parser('1 / x + y').parse())
+        values = evaluator.eval_many({'x': [0, 1, 2], 'y': 1}, errors='clip')
+        self.assertTrue(np.array_equal(values, [np.finfo(float).max, 2, 1.5]))
+        self.assertEqual(values.dtype, float)
+
+        self.assertRaises(KeyError, lambda: evaluator.eval_many({'x': [1], 'y': [1], 'z': [1]}))
+        self.assertRaises(Exception, lambda: evaluator.eval_many({'x': [1]}))
+        self.assertTrue(np.array_equal(Evaluator(Parser('2 ^ 3').parse()).eval_many({}), [8.0]))
+        self.assertEqual(evaluator.eval_many({'x': 1.0, 'y': 2.0}).shape, (1,))
+        self.assertEqual(evaluator.eval_many({'x': [], 'y': 2.0}).shape, (0,))
+
+    def test_deep_expressions(self):
+        # Each expression has more than 10^5 nodes.
+        depth = 40000
+        evaluator = Evaluator(Parser('(1 + ' * depth + 'x' + ')' * depth).parse())
+        evaluator.set_var('x', 0.5)
+        self.assertEqual(evaluator.eval(), depth + 0.5)
+
+        evaluator = Evaluator(Parser('-' * (4 * depth + 1) + 'x').parse())
+        evaluator.set_var('x', 2.0)
+        self.assertEqual(evaluator.eval(), -2.0)
+
+        evaluator = Evaluator(Parser(' - '.join(['x'] * 2 * depth)).parse())
+        evaluator.set_var('x', 1.0)
+        self.assertEqual(evaluator.eval(), 2.0 - 2 * depth)
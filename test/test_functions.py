@@ -0,0 +1,183 @@
+import math
+import unittest
+
+import numpy as np
+
+from cache import ExpressionCache, SampleCache
+from compiler import compile_ast
+from evaluator import Evaluator, evaluate_in_range, evaluate_vectorized
+from expr_parser.dag import build_dag
+from expr_parser.functions import CONSTANTS, FUNCTIONS, get_function, register_constant, register_function
+from expr_parser.nodes import *
+from expr_parser.optimizer import optimize
+from expr_parser.parser import Parser
+
+
+class TestFunctions(unittest.TestCase):
+
+    def tearDown(self):
+        FUNCTIONS.pop('hypot', None)
+        FUNCTIONS.pop('double', None)
+        FUNCTIONS.pop('triple', None)
+        FUNCTIONS.pop('scale', None)
+        CONSTANTS.pop('scale', None)
+
+    @staticmethod
+    def get_results(expr, **variables):
+        ast = Parser(expr).parse()
+        evaluator = Evaluator(ast)
+        for name, value in variables.items():
+            evaluator.set_var(name, value)
+        return evaluator.eval(), compile_ast(ast).eval(**variables)
+
+    def test_builtin_functions(self):
+        expected = {
+            'sin(x)': math.sin(0.7),
+            'cos(x) ^ 2 + sin(x) ^ 2': math.cos(0.7) ** 2 + math.sin(0.7) ** 2,
+            'exp(x) * log(x)': math.exp(0.7) * math.log(0.7),
+            'sqrt(abs(0 - x))': math.sqrt(0.7),
+            '2 * pi * x + e': 2 * math.pi * 0.7 + math.e,
+            'sin(cos(x) + 1) / -exp(x)': math.sin(math.cos(0.7) + 1) / -math.exp(0.7),
+        }
+        for expr, value in expected.items():
+            result, compiled_result = self.get_results(expr, x=0.7)
+            self.assertEqual(result, value, expr)
+            self.assertEqual(compiled_result, value, expr)
+            self.assertIsInstance(result, float)
+
+    def test_evaluation_errors(self):
+        for expr, message in [('log(x)', 'Evaluation Error: Math domain error in function \'log\''),
+                              ('exp(x * 1000)', 'Evaluation Error: Math range error in function \'exp\'')]:
+            evaluator = Evaluator(Parser(expr).parse())
+            evaluator.set_var('x', -1.0 if expr == 'log(x)' else 1.0)
+            with self.assertRaises(Exception) as context:
+                evaluator.eval()
+            self.assertEqual(str(context.exception), message)
+
+        values = Evaluator(Parser('log(x) + log(-1)').parse()).eval_many({'x': [1.0, 2.0]})
+        self.assertTrue(np.all(np.isnan(values)))
+
+        # The second expression is deeper than MAX_CLOSURE_DEPTH, so it is compiled into a flat program.
+        for expr in ['log(x)', 'abs(' * 300 + 'log(x)' + ')' * 300]:
+            compiled = compile_ast(Parser(expr).parse())
+            with self.assertRaises(ValueError) as context:
+                compiled.eval(x=-1.0)
+            self.assertEqual(str(context.exception), 'Evaluation Error: Math domain error in function \'log\'')
+
+    def test_folded_constants_follow_error_policy(self):
+        # The NumPy fallback is optimized again, folding its calls must keep NumPy numbers.
+        x_values = np.array([0.5, 1.5])
+        for expr in ['exp(exp(exp(3))) * x', '-sin(0.5) ^ abs(exp(2)) + x', '-sin(0.5) ^ abs(exp(2))']:
+            for optimize_tree in [True, False]:
+                y_values = evaluate_vectorized(Parser(expr).parse(), x_values, optimize=optimize_tree)
+                self.assertTrue(np.all(np.isnan(y_values)), expr)
+            self.assertRaises(Exception, lambda: evaluate_vectorized(Parser(expr).parse(), x_values, errors='raise'))
+
+        register_function('double', lambda value: 2j * value, lambda values: 2j * values)
+        self.assertRaises(Exception, lambda: evaluate_vectorized(Parser('double(x)').parse(), x_values))
+
+    def test_vectorized_functions(self):
+        x_values = np.linspace(0.1, 5, 101)
+        y_values = evaluate_vectorized(Parser('sqrt(x) * log(x) + sin(pi * x)').parse(), x_values)
+        self.assertTrue(np.allclose(y_values, np.sqrt(x_values) * np.log(x_values) + np.sin(np.pi * x_values)))
+
+        y_values = evaluate_vectorized(Parser('log(x) + sqrt(x)').parse(), np.array([-1.0, 0.0, 1.0]))
+        self.assertTrue(np.array_equal(y_values, [np.nan, np.nan, 1.0], equal_nan=True))
+        y_values = evaluate_vectorized(Parser('x + log(0)').parse(), np.array([1.0]), errors='clip')
+        self.assertEqual(y_values[0], -np.finfo(float).max)
+
+    def test_parse_calls(self):
+        ast = Parser('sin(x + 1) * 2').parse()
+        self.assertEqual(ast.errors, [])
+        self.assertEqual(ast.identifiers, {'x'})
+        call = ast.main_expression.left_expression
+        self.assertTrue(isinstance(call, FunctionCallNode))
+        self.assertIs(call.function, get_function('sin'))
+        self.assertTrue(isinstance(call.arguments[0], BinaryExpressionNode))
+        self.assertEqual(len(call.get_children()), 4)
+
+        constant = Parser('pi').parse().main_expression
+        self.assertTrue(isinstance(constant, NumberExpressionNode))
+        self.assertEqual(constant.number_token.value, math.pi)
+
+    def test_parse_errors(self):
+        self.assertEqual(Parser('foo(x)').parse().errors, ['Parser Error: Unknown function \'foo\' at column 0.'])
+        self.assertEqual(Parser('sin(x, 1)').parse().errors,
+                         ['Parser Error: Function \'sin\' takes 1 argument, got 2.'])
+        self.assertEqual(len(Parser('sin()').parse().errors), 1)
+        self.assertEqual(len(Parser('sin(x').parse().errors), 1)
+        self.assertEqual(len(Parser('x, 1').parse().errors), 1)
+
+    def test_register_function(self):
+        register_function('hypot', math.hypot, 'hypot', arity=2)
+        result, compiled_result = self.get_results('hypot(x, 4) + 1', x=3.0)
+        self.assertEqual(result, 6.0)
+        self.assertEqual(compiled_result, 6.0)
+        self.assertEqual(Parser('hypot(x)').parse().errors,
+                         ['Parser Error: Function \'hypot\' takes 2 arguments, got 1.'])
+
+        # Without a vector function, the scalar function is applied to each element.
+        register_function('double', lambda value: 2 * value)
+        y_values = evaluate_vectorized(Parser('double(x) + hypot(x, 0)').parse(), np.array([-1.0, 2.0]))
+        self.assertTrue(np.array_equal(y_values, [-1.0, 6.0]))
+
+        self.assertRaises(ValueError, lambda: register_function('not valid', abs))
+        self.assertRaises(ValueError, lambda: register_function('nothing', abs, arity=0))
+        self.assertRaises(ValueError, lambda: register_constant('2pi', 2 * math.pi))
+
+    def test_parallel_calls(self):
+        # The lambda can not be pickled, so the workers look the function up by name.
+        register_function('triple', lambda value: 3 * value)
+        ast = Parser('triple(x) + sin(x)').parse()
+        x, y = evaluate_in_range(ast, 0, 1, n_points=1000, parallel=True)
+        self.assertTrue(np.allclose(y, 3 * x + np.sin(x)))
+
+        # A function that is no longer registered under its name is evaluated in this process.
+        register_function('triple', lambda value: 4 * value)
+        _, y = evaluate_in_range(ast, 0, 1, n_points=1000, parallel=True)
+        self.assertTrue(np.allclose(y, 3 * x + np.sin(x)))
+
+    def test_registering_empties_caches(self):
+        expression_cache = ExpressionCache()
+        sample_cache = SampleCache()
+        compiled = expression_cache.compile('x * scale')
+        function = lambda x_values: compiled.eval(x=x_values, scale=2.0)
+        sample_cache.sample('x * scale', function, 0, 1, n_points=100)
+
+        register_constant('scale', 3.0)
+        self.assertEqual(expression_cache.compile('x * scale').eval(x=1.0), 3.0)
+        self.assertEqual(expression_cache.info().currsize, 1)
+        _, y = sample_cache.sample('x * scale', lambda x_values: 3.0 * x_values, 0, 1, n_points=100)
+        self.assertEqual(y[-1], 3.0 * 63 / 64)
+        self.assertEqual(sample_cache.cached_points, 64)
+
+    def test_constants_are_reserved(self):
+        evaluator = Evaluator(Parser('x * e').parse())
+        self.assertEqual(evaluator.ast.identifiers, {'x'})
+        with self.assertRaises(KeyError) as context:
+            evaluator.set_var('e', 1.0)
+        self.assertIn('\'e\' is a constant', str(context.exception))
+        self.assertRaises(KeyError, lambda: evaluator.eval_many({'x': [1.0], 'e': [1.0]}))
+
+    def test_optimize_and_share_calls(self):
+        root_node = optimize(Parser('sin(0) + x * sqrt(4)').parse()).main_expression
+        # sin(0) + X is folded to X, and sqrt(4) to 2.
+        self.assertTrue(isinstance(root_node.left_expression, IdentifierNode))
+        self.assertEqual(root_node.right_expression.number_token.value, 2.0)
+        self.assertTrue(isinstance(optimize(Parser('log(0)').parse()).main_expression, FunctionCallNode))
+
+        dag = build_dag(Parser('sin(x) ^ 2 + sin(x) * cos(x)').parse())
+        # The second sin(x), and the x of both calls to sin and cos.
+        self.assertEqual(dag.deduplicated_nodes, 3)
+        self.assertEqual(compile_ast(Parser('sin(x) ^ 2 + sin(x) * cos(x)').parse()).eval(x=1.0),
+                         math.sin(1.0) ** 2 + math.sin(1.0) * math.cos(1.0))
+
+    def test_deeply_nested_calls(self):
+        depth = 40000
+        ast = Parser('abs(' * depth + 'x' + ')' * depth).parse()
+        self.assertEqual(ast.errors, [])
+        evaluator = Evaluator(ast)
+        evaluator.set_var('x', -2.0)
+        self.assertEqual(evaluator.eval(), 2.0)
+        self.assertEqual(compile_ast(ast).eval(x=-2.0), 2.0)
+        self.assertTrue(np.array_equal(evaluate_vectorized(ast, np.array([-2.0, 3.0])), [2.0, 3.0]))
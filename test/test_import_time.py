@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import times, in microseconds, above which importing a module counts as a regression.
+# They leave room for slow machines, importing numpy alone takes longer than any of them.
+IMPORT_TIME_THRESHOLDS = {
+    'expr_parser.parser': 40000,
+    'compiler': 60000,
+    'evaluator': 60000,
+    'cache': 75000,
+}
+
+HEAVY_MODULES = ['numpy', 'multiprocessing', 'PyQt5', 'matplotlib']
+
+
+def measure_import(module, runs=3):
+    """ Imports `module` in fresh interpreters with `-X importtime`.
+
+    :return: The best cumulative import time of the module in microseconds, and the modules it imported.
+    """
+    best_time = None
+    imported = set()
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                 cwd=PROJECT_DIR, capture_output=True, text=True, check=True)
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not cumulative.strip().isdigit():
+                continue
+            imported.add(name.strip())
+            if name.strip() == module:
+                cumulative = int(cumulative)
+                best_time = cumulative if best_time is None else min(best_time, cumulative)
+
+    return best_time, imported
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_no_heavy_imports(self):
+        for module in IMPORT_TIME_THRESHOLDS:
+            _, imported = measure_import(module, runs=1)
+            for heavy_module in HEAVY_MODULES:
+                self.assertNotIn(heavy_module, imported, f'importing {module} loads {heavy_module}')
+
+    def test_import_time(self):
+        for module, threshold in IMPORT_TIME_THRESHOLDS.items():
+            import_time, _ = measure_import(module)
+            self.assertLess(import_time, threshold, f'importing {module} took {import_time} us')
@@ -83,3 +83,49 @@ class TestLexer(unittest.TestCase):
         _ = lexer.tokenize()
         self.assertEqual(len(lexer.errors), 4)
 
+
+    def test_whitespace_is_skipped(self):
+        expr = '\t x \n*\r 2  '
+        lexer = Lexer(expr)
+        tokens = lexer.tokenize()
+        self.assertEqual(len(lexer.errors), 0)
+        self.assertEqual(tokens, [
+            Token(TokenKind.IDENTIFIER, 'x', expr.index('x')),
+            Token(TokenKind.STAR, '*', expr.index('*')),
+            Token(TokenKind.NUMBER, 2.0, expr.index('2')),
+            Token(TokenKind.END_OF_FILE, None, len(expr)),
+        ])
+
+    def test_non_ascii_identifier(self):
+        expr = 'x_é + ß'
+        lexer = Lexer(expr)
+        tokens = lexer.tokenize()
+        self.assertEqual(len(lexer.errors), 0)
+        self.assertEqual(tokens, [
+            Token(TokenKind.IDENTIFIER, 'x_é', 0),
+            Token(TokenKind.PLUS, '+', expr.index('+')),
+            Token(TokenKind.IDENTIFIER, 'ß', expr.index('ß')),
+            Token(TokenKind.END_OF_FILE, None, len(expr)),
+        ])
+
+    def test_long_tokens(self):
+        identifier = 'x' * 100000
+        number = '1' * 300 + '.5'
+        expr = f'{identifier} - {number}'
+        tokens = Lexer(expr).tokenize()
+        self.assertEqual(tokens, [
+            Token(TokenKind.IDENTIFIER, identifier, 0),
+            Token(TokenKind.MINUS, '-', len(identifier) + 1),
+            Token(TokenKind.NUMBER, float(number), len(identifier) + 3),
+            Token(TokenKind.END_OF_FILE, None, len(expr)),
+        ])
+
+    def test_function_call(self):
+        expr = 'f(x, 2)'
+        lexer = Lexer(expr)
+        tokens = lexer.tokenize()
+        self.assertEqual(len(lexer.errors), 0)
+        self.assertEqual([token.kind for token in tokens], [
+            TokenKind.IDENTIFIER, TokenKind.LEFT_PAREN, TokenKind.IDENTIFIER, TokenKind.COMMA, TokenKind.NUMBER,
+            TokenKind.RIGHT_PAREN, TokenKind.END_OF_FILE,
+        ])
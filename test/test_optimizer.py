@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+from compiler import compile_ast
+from evaluator import evaluate_in_range
+from expr_parser.nodes import *
+from expr_parser.optimizer import optimize
+from expr_parser.parser import Parser
+
+
+class TestOptimizer(unittest.TestCase):
+
+    @staticmethod
+    def optimize_expr(expr):
+        return optimize(Parser(expr).parse()).main_expression
+
+    def test_fold_constants(self):
+        root_node = self.optimize_expr('2^10 * x + (3 + 4)')
+        self.assertTrue(isinstance(root_node, BinaryExpressionNode))
+        self.assertEqual(root_node.right_expression.number_token.value, 7)
+
+        product = root_node.left_expression
+        self.assertEqual(product.left_expression.number_token.value, 2 ** 10)
+        self.assertTrue(isinstance(product.right_expression, IdentifierNode))
+
+    def test_fold_full_expression(self):
+        root_node = self.optimize_expr('-(2 * (3 + 4)) ^ 2')
+        self.assertTrue(isinstance(root_node, NumberExpressionNode))
+        self.assertEqual(root_node.number_token.value, (-(2 * (3 + 4))) ** 2)
+
+    def test_drop_parentheses(self):
+        root_node = self.optimize_expr('((x))')
+        self.assertTrue(isinstance(root_node, IdentifierNode))
+
+    def test_identities(self):
+        for expr in ['x * 1', '1 * x', 'x / 1', 'x + 0', '0 + x', 'x - 0', 'x ^ 1', '+x', '--x',
+                     '(x * (3 - 2)) ^ (5 - 4)']:
+            self.assertTrue(isinstance(self.optimize_expr(expr), IdentifierNode), expr)
+
+    def test_keep_unsafe_subtrees(self):
+        root_node = self.optimize_expr('1 / 0 + x')
+        self.assertTrue(isinstance(root_node.left_expression, BinaryExpressionNode))
+
+        root_node = self.optimize_expr('x * 0')
+        self.assertTrue(isinstance(root_node, BinaryExpressionNode))
+
+    def test_matches_unoptimized(self):
+        expressions = [
+            '2^10 * x + (3 + 4)',
+            '-2 * x ^ -3 * 1 + 0',
+            '--x ^ 1 / (1 + 0) - -(3 * 4)',
+            '(x + 1) * (2 - 1) ^ (x / x)',
+            '-------------+++++++++++++++++++-----++-+-------------------3 * x',
+            '1 / (x - x) + 2 ^ 0.5',
+        ]
+        for expr in expressions:
+            ast = Parser(expr).parse()
+            for x in [-2.5, 0.0, 1.0, 3.141592]:
+                try:
+                    expected = compile_ast(ast, optimize=False).eval(x=x)
+                except ZeroDivisionError:
+                    self.assertRaises(ZeroDivisionError, lambda: compile_ast(ast).eval(x=x))
+                    continue
+                self.assertEqual(compile_ast(ast).eval(x=x), expected, expr)
+
+            _, y_expected = evaluate_in_range(ast, -10, 10, n_points=1000, optimize=False)
+            _, y = evaluate_in_range(ast, -10, 10, n_points=1000)
+            self.assertTrue(np.allclose(y, y_expected, rtol=1e-12, atol=0.0, equal_nan=True), expr)
+
+    def test_input_not_modified(self):
+        ast = Parser('(1 + 2) * x').parse()
+        optimize(ast)
+        self.assertTrue(isinstance(ast.main_expression.left_expression, ParenthesizedExpressionNode))
+
+    def test_deep_expression(self):
+        # Both expressions have more than 10^5 nodes.
+        depth = 40000
+        root_node = optimize(Parser('(' * depth + '--x + 0' + ')' * depth).parse()).main_expression
+        self.assertTrue(isinstance(root_node, IdentifierNode))
+
+        root_node = optimize(Parser('(2 * ' * depth + '1' + ')' * depth).parse()).main_expression
+        self.assertEqual(root_node.number_token.value, float('inf'))
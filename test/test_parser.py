@@ -1,5 +1,8 @@
+import contextlib
+import io
 import unittest
 
+from expr_parser.AST import print_ast
 from expr_parser.parser import *
 
 
@@ -110,3 +113,56 @@ class TestParser(unittest.TestCase):
 
         bin_expr = ast.main_expression.operand.main_expression
         self.assertTrue(isinstance(bin_expr, BinaryExpressionNode))
+
+    def test_compact_nodes(self):
+        ast = Parser('-(x + 2) * y ^ 3').parse()
+        self.assertEqual(ast.errors, [])
+        stack = [ast.main_expression]
+        visited = 0
+        while len(stack) > 0:
+            node = stack.pop()
+            visited += 1
+            self.assertFalse(hasattr(node, '__dict__'))
+            self.assertTrue(isinstance(node.get_children(), tuple))
+            stack.extend(node.get_children())
+        self.assertEqual(visited, 19)
+
+    def test_deeply_nested_parentheses(self):
+        depth = 100000
+        ast = Parser('(' * depth + 'x' + ')' * depth).parse()
+        self.assertEqual(ast.errors, [])
+        node = ast.main_expression
+        for _ in range(depth):
+            self.assertTrue(isinstance(node, ParenthesizedExpressionNode))
+            node = node.main_expression
+        self.assertTrue(isinstance(node, IdentifierNode))
+
+        ast = Parser('(' * depth + 'x').parse()
+        self.assertEqual(len(ast.errors), depth)
+        self.assertTrue(ast.errors[0].startswith('Parser Error: Unexpected token of type \'END_OF_FILE\''))
+
+    def test_long_operator_chains(self):
+        length = 100000
+        ast = Parser('-' * length + 'x').parse()
+        node = ast.main_expression
+        for _ in range(length):
+            self.assertEqual(node.operator_token.kind, TokenKind.MINUS)
+            node = node.operand
+        self.assertTrue(isinstance(node, IdentifierNode))
+
+        ast = Parser(' - '.join(['x'] * length)).parse()
+        node = ast.main_expression
+        for _ in range(length - 1):
+            self.assertTrue(isinstance(node.right_expression, IdentifierNode))
+            node = node.left_expression
+        self.assertTrue(isinstance(node, IdentifierNode))
+
+    def test_print_deep_ast(self):
+        depth = 2000
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            print_ast(Parser('(' * depth + '1' + ')' * depth).parse().main_expression)
+        lines = output.getvalue().splitlines()
+        # Each parenthesized expression prints itself and its two parentheses, then the number and its token.
+        self.assertEqual(len(lines), 3 * depth + 2)
+        self.assertTrue(lines[2 * depth + 1].endswith('└── Token 1.0'))
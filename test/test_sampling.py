@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+
+from evaluator import evaluate_in_range
+from expr_parser.parser import Parser
+from sampling import decimate_min_max, evaluate_adaptive
+
+
+class TestSampling(unittest.TestCase):
+
+    @staticmethod
+    def sample(expr, *args, **kwargs):
+        return evaluate_adaptive(Parser(expr).parse(), *args, **kwargs)
+
+    def test_straight_line_stays_coarse(self):
+        x, y = self.sample('2 * x + 1', -10, 10, initial_points=65)
+        self.assertEqual(len(x), 65)
+        self.assertTrue(np.allclose(y, 2 * x + 1))
+
+    def test_sorted_within_range(self):
+        x, y = self.sample('x ^ 3 - 4 * x', 3, -3)
+        self.assertEqual(len(x), len(y))
+        self.assertTrue(np.all(np.diff(x) > 0))
+        self.assertEqual(x[0], -3)
+        self.assertEqual(x[-1], 3)
+
+    def test_matches_dense_grid(self):
+        expr = '1 / (1 + 25 * x ^ 2) + x ^ 5'
+        tolerance = 1e-3
+        x, y = self.sample(expr, -2, 2, tolerance=tolerance)
+        self.assertLess(len(x), 5000)
+
+        x_dense, y_dense = evaluate_in_range(Parser(expr).parse(), -2, 2, n_points=50000)
+        self.assertTrue(np.allclose(np.interp(x_dense, x, y), y_dense, rtol=0.0, atol=tolerance * 4 * np.ptp(y)))
+
+    def test_refines_where_curved(self):
+        x, _ = self.sample('1 / (1 + 100 * x ^ 2)', -10, 10)
+        spacing = np.diff(x)
+        self.assertLess(spacing[np.abs(x[:-1]) < 1].min() * 10, spacing[np.abs(x[:-1]) > 5].min())
+
+    def test_discontinuity_is_bounded(self):
+        x, y = self.sample('1 / x', -1, 1, max_points=2000)
+        self.assertLessEqual(len(x), 2000)
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+        x, y = self.sample('1 / (x - 0.3)', -1, 1, max_depth=10)
+        self.assertGreater(np.count_nonzero(np.abs(x - 0.3) < 0.1), len(x) / 2)
+
+    def test_max_points(self):
+        x, _ = self.sample('x ^ 10 - x ^ 3 / (x - 0.5)', -5, 5, tolerance=1e-9, max_points=500)
+        self.assertEqual(len(x), 500)
+
+    def test_empty_range(self):
+        x, y = self.sample('x', 1, 1)
+        self.assertEqual(x, [])
+        self.assertEqual(y, [])
+
+    def test_decimate_keeps_extremes(self):
+        x = np.linspace(-1, 1, 100001)
+        y = np.sin(40 * x) + (np.abs(x - 0.3) < 1e-5) * 5
+        x_decimated, y_decimated = decimate_min_max(x, y, 640)
+
+        self.assertLessEqual(len(x_decimated), 2 * 640 + 2)
+        self.assertTrue(np.all(np.diff(x_decimated) > 0))
+        self.assertEqual(x_decimated[0], -1)
+        self.assertEqual(x_decimated[-1], 1)
+        self.assertEqual(y_decimated.max(), y.max())
+        self.assertEqual(y_decimated.min(), y.min())
+
+    def test_decimate_keeps_gaps(self):
+        x = np.linspace(-1, 1, 100000)
+        y = x.copy()
+        y[5000] = np.nan
+        y[70000] = np.inf
+        _, y_decimated = decimate_min_max(x, y, 100)
+        self.assertEqual(np.count_nonzero(np.isnan(y_decimated)), 1)
+        self.assertEqual(np.count_nonzero(np.isinf(y_decimated)), 1)
+
+    def test_decimate_small_input(self):
+        x = np.arange(10.0)
+        x_decimated, y_decimated = decimate_min_max(x, x ** 2, 640)
+        self.assertTrue(np.array_equal(x_decimated, x))
+        self.assertTrue(np.array_equal(y_decimated, x ** 2))